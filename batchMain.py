@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import time
+
+from modules.BatchRunner import dedupeJobs, loadJobs, runBatch
+from modules.Tracing import startTrace, stopTrace
+
+
+if __name__ == "__main__":
+
+    # 例: python batchMain.py input9.json input16.json --count 3 --workers 8 --output results.jsonl
+    parser = argparse.ArgumentParser(description="入力ファイルの盤面から唯一解の問題をまとめて生成する")
+    parser.add_argument("inputFiles", nargs="+", help="入力JSONファイル")
+    parser.add_argument("--keys", nargs="+", default=None, help="使う入力キー(省略時はファイル内の全てのキー)")
+    parser.add_argument("--algorithm", type=int, choices=[0, 1, 2, 3], default=1,
+                        help="0: オリジナル 1: 再利用なし 2: 再利用あり(解の補充なし) 3: 再利用あり(解の補充あり)")
+    parser.add_argument("--count", type=int, default=1, help="入力キーごとに生成する問題の数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="同時に実行するプロセス数")
+    parser.add_argument("--backend", default="gurobi", help="解盤面の列挙に使うソルバー(全サイズ共通)")
+    parser.add_argument("--max-solutions", type=int, default=None, help="MAX_SOLUTIONS(省略時はサイズごとの既定値)")
+    parser.add_argument("--target-hint-count", type=int, default=None, help="ランダムに追加した後のヒント数(省略時はサイズごとの既定値)")
+    parser.add_argument("--change-generation-limit", type=int, choices=[0, 2], default=0,
+                        help="G1の列挙数 0: 毎回MAX_SOLUTIONS個 2: 出現回数最小のマスが安定したら打ち切る")
+    parser.add_argument("--stable-window", type=int, default=30)
+    parser.add_argument("--limit-time", type=float, default=1800, help="1問あたりの制限時間(秒)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--dedupe", action="store_true",
+                        help="転置・行列の並べ替え・数字の付け替えで同じになる入力盤面は1つだけ生成する")
+    parser.add_argument("--trace", default=None, help="段階ごとの所要時間を1行1イベントのJSONで追記するファイル")
+    parser.add_argument("--output", default=None, help="結果を1行1問のJSONで書き出すファイル")
+    args = parser.parse_args()
+
+    settings = {
+        "algorithmChoice": args.algorithm,
+        "solverBackends": {size: args.backend for size in (9, 16, 25)},  # 全サイズで同じソルバーを使う
+        "maxSolutions": args.max_solutions,
+        "targetHintCount": args.target_hint_count,
+        "changeGenerationLimit": args.change_generation_limit,
+        "generationLimits": None,
+        "stableWindow": args.stable_window,
+        "limitTime": args.limit_time,
+    }
+
+    jobs = loadJobs(args.inputFiles, args.keys, args.count)
+    if args.dedupe:
+        jobs, skippedJobs = dedupeJobs(jobs)
+        for job, firstJob in skippedJobs:
+            if job["repetition"] == 0:
+                print(f"スキップ: {job['inputFile']} {job['inputKey']} ({firstJob['inputFile']} {firstJob['inputKey']} と同じ盤面)")
+    print(f"ジョブ数: {len(jobs)} (プロセス数: {args.workers})")
+
+    if args.trace:
+        startTrace(args.trace)  # ワーカープロセスにも引き継がれる
+    outputFile = open(args.output, 'w', encoding="utf-8") if args.output else None
+    startTime = time.time()
+    results = []
+    try:
+        # 終わった問題から順に表示する
+        for result in runBatch(jobs, settings, args.workers, args.seed):
+            results.append(result)
+            label = f"[{len(results)}/{len(jobs)}] {result['inputFile']} {result['inputKey']} #{result['repetition'] + 1}"
+            if "error" in result:
+                print(f"{label}: 失敗 ({result['error']})")
+            else:
+                print(f"{label}: 追加ヒント数 {result['numberOfHintsAdded']}, 生成時間 {result['generationTime']:.2f}秒")
+            if outputFile:
+                outputFile.write(json.dumps(result, ensure_ascii=False) + "\n")
+                outputFile.flush()
+    finally:
+        if outputFile:
+            outputFile.close()
+        stopTrace()
+    totalTime = time.time() - startTime
+
+    # 全体のスループット
+    succeeded = [result for result in results if "error" not in result]
+    totalHints = sum(result["numberOfHintsAdded"] for result in succeeded)
+    totalGenerationTime = sum(result["generationTime"] for result in succeeded)
+    print("\n=== 集計 ===")
+    print(f"成功: {len(succeeded)} / {len(results)}")
+    print(f"総時間: {totalTime:.2f}秒")
+    print(f"1時間あたりの生成数: {len(succeeded) / totalTime * 3600:.1f}" if totalTime > 0 else "1時間あたりの生成数: -")
+    if succeeded:
+        print(f"1問あたりの平均生成時間: {totalGenerationTime / len(succeeded):.2f}秒")
+        print(f"1問あたりの平均追加ヒント数: {totalHints / len(succeeded):.2f}")
+    if totalHints > 0:
+        print(f"追加ヒント1つあたりの時間: {totalGenerationTime / totalHints:.3f}秒")
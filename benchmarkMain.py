@@ -0,0 +1,77 @@
+import argparse
+import sys
+
+from modules.BatchRunner import loadJobs
+from modules.Benchmark import (
+    DEFAULT_INPUT_FILES, caseName, compareWithBaseline, loadSummary, runBenchmark, saveReport, summarizeRuns)
+
+
+def formatValue(value, digits=3):
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+if __name__ == "__main__":
+
+    # 例: python benchmarkMain.py --repetitions 3 --output benchmark.json
+    #     python benchmarkMain.py --baseline benchmark.json --output benchmarkNew.json
+    parser = argparse.ArgumentParser(description="ALGORITHM_CHOICE 0〜3を同じ入力・同じシードで比べる")
+    parser.add_argument("inputFiles", nargs="*", default=DEFAULT_INPUT_FILES, help="入力JSONファイル(省略時は全て)")
+    parser.add_argument("--keys", nargs="+", default=None, help="使う入力キー(省略時はファイル内の全てのキー)")
+    parser.add_argument("--algorithms", type=int, nargs="+", choices=[0, 1, 2, 3], default=[0, 1, 2, 3])
+    parser.add_argument("--repetitions", type=int, default=3, help="入力キーごとの繰り返し回数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", default="gurobi", help="解盤面の列挙に使うソルバー(全サイズ共通)")
+    parser.add_argument("--max-solutions", type=int, default=None, help="MAX_SOLUTIONS(省略時はサイズごとの既定値)")
+    parser.add_argument("--target-hint-count", type=int, default=None, help="ランダムに追加した後のヒント数(省略時はサイズごとの既定値)")
+    parser.add_argument("--limit-time", type=float, default=1800, help="1ケースあたりの制限時間(秒)")
+    parser.add_argument("--output", default="benchmark.json", help="結果を書き出すJSONファイル")
+    parser.add_argument("--baseline", default=None, help="比べるベースラインのJSONファイル(以前の--output)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="回帰とみなす悪化の割合")
+    args = parser.parse_args()
+
+    settingsList = [{
+        "algorithmChoice": algorithmChoice,
+        "solverBackends": {size: args.backend for size in (9, 16, 25)},
+        "maxSolutions": args.max_solutions,
+        "targetHintCount": args.target_hint_count,
+        "changeGenerationLimit": 0,
+        "generationLimits": None,
+        "stableWindow": 30,
+        "limitTime": args.limit_time,
+    } for algorithmChoice in args.algorithms]
+
+    jobs = loadJobs(args.inputFiles, args.keys, args.repetitions)
+    print(f"ケース数: {len(jobs) * len(settingsList)}")
+
+    runs = []
+    for run in runBenchmark(jobs, settingsList, args.seed):
+        runs.append(run)
+        label = f"[{len(runs)}/{len(jobs) * len(settingsList)}] {caseName(run)} #{run['repetition'] + 1}"
+        if run["success"]:
+            print(f"{label}: {formatValue(run['wallTime'], 2)}秒, 追加ヒント数 {run['numberOfHintsAdded']}, "
+                  f"ソルバー呼び出し {run['solverCalls']}, ピークメモリ {formatValue(run['peakRssMB'], 1)}MB")
+        else:
+            print(f"{label}: 失敗 ({run['error']})")
+
+    summary = summarizeRuns(runs)
+    saveReport(args.output, settingsList, runs, summary)
+
+    # ケースごとの中央値
+    print("\n=== 集計(中央値) ===")
+    print("ケース | 成功率 | 時間(秒) | ヒント1つあたり(秒) | ソルバー呼び出し | 解/秒 | 追加ヒント数 | ピークメモリ(MB)")
+    for name, case in summary.items():
+        print(f"{name} | {case['successRate']:.2f} | {formatValue(case['wallTime'], 2)} | "
+              f"{formatValue(case['timePerHint'])} | {formatValue(case['solverCalls'], 0)} | "
+              f"{formatValue(case['solutionsPerSecond'], 1)} | {formatValue(case['numberOfHintsAdded'], 1)} | "
+              f"{formatValue(case['peakRssMB'], 1)}")
+    print(f"結果: {args.output}")
+
+    if args.baseline:
+        regressions = compareWithBaseline(summary, loadSummary(args.baseline), args.tolerance)
+        print(f"\n=== ベースライン({args.baseline})との比較 ===")
+        for name, metric, previous, current in regressions:
+            print(f"回帰: {name} {metric}: {formatValue(previous)} -> {formatValue(current)}")
+        if regressions:
+            print(f"回帰: {len(regressions)}件")
+            sys.exit(1)
+        print("回帰なし")
@@ -1,18 +1,13 @@
-import time
+import os
 import json
-import random  # ランダムなヒント追加のために追加
 
 from modules.ConvertToNumber import ConvertToNumber
 from modules.Validation import Validation
 from modules.AddHintToLineSymmetry import AddHintToLineSymmetry
 from modules.UnifiedNumberOfHints import UnifiedNumberOfHints
+from modules.ChallengeRunner import runChallenges
 
-from modules.generateUniqueSolutionOriginal import generateUniqueSolutionOriginal
-from modules.generateUniqueSolutionG1 import generateUniqueSolutionG1
-from modules.generateUniqueSolutionG2 import generateUniqueSolutionG2
-from modules.generateUniqueSolutionG3 import generateUniqueSolutionG3
-
-from utility.generateSolutionBoardG import generateSolutionBoardG
+from utility.generateSolutionBoardB import generateSolutionBoardB
 from utility.printBoard import printBoard
 
 
@@ -30,7 +25,11 @@ if __name__ == "__main__":
     ALGORITHM_CHOICE = 1
     AddHintToLineTarget = 0  # 1: 線対称にヒントを追加する, 0: 線対称ヒントを追加しない
     # 0: 毎回MAX_SOLUTIONS個生成．1: generationLimitsに格納された上限数をヒント追加ごとに設定
+    # 2: 出現回数最小の(マス, 数字)がSTABLE_WINDOW個の解の間変わらなければ打ち切る(上限はMAX_SOLUTIONS)
     changeGenerationLimit = 0
+    STABLE_WINDOW = 30
+    # グリッドサイズごとの解盤面の列挙に使うソルバー ("gurobi", "gurobiReduced", "gurobiPersistent", "gurobiPool", "gurobiPoolReduced", "dancingLinks", "bitmask", "bitmaskSampling", "gurobiSampling", "bitmaskCube", "gurobiCube", "gurobiCached", "bitmaskCached")
+    SOLVER_BACKENDS = {9: "gurobi", 16: "gurobi", 25: "gurobi"}
 
     # 全体の時間制限を30分に設定
     TOTAL_LIMIT_TIME = 3600  # 30分を秒に換算
@@ -38,6 +37,9 @@ if __name__ == "__main__":
     # 早期終了を有効にするかどうか (0: 無効, 1: 有効)
     EARLY_TERMINATION_ENABLED = 0  # 0または1で設定
 
+    # 同時に実行するチャレンジの数(プロセス数)．1なら1つずつ順番に実行する
+    NUMBER_OF_WORKERS = os.cpu_count() or 1
+
     #########################################################
 
     # JSONファイルを読み込む
@@ -80,11 +82,11 @@ if __name__ == "__main__":
     else:
         print("バリデーション成功")
 
-    # generateSolutionBoard関数を使用して解盤面Aを取得
+    # ビット集合の制約伝播ソルバーで解盤面Aを取得
     boardA = [row[:]
               for row in dataConvertedToNumbers['boardConvertedToNumber']]
 
-    isSolutionGenerated = generateSolutionBoardG(boardA)
+    isSolutionGenerated = generateSolutionBoardB(boardA)
 
     if not isSolutionGenerated:
         print("解盤面Aの生成に失敗しました。")
@@ -114,122 +116,95 @@ if __name__ == "__main__":
     challenge_solutions_per_iteration = []
     challenge_time_per_hint = []
 
-    # 全体の開始時間
-    total_start_time = time.time()
+    # maxNumberに応じた設定
+    if maxNumber == 9:
+        MAX_SOLUTIONS = 1000
+        # TARGET_ADDED_HINTS は既に設定済み
+    elif maxNumber == 16:
+        MAX_SOLUTIONS = None  # 上限盤面数を特に設定しない
+        # TARGET_ADDED_HINTS は None
+    elif maxNumber == 25:
+        MAX_SOLUTIONS = None  # 上限盤面数を特に設定しない
+        # TARGET_ADDED_HINTS は None
+    else:
+        MAX_SOLUTIONS = 100
+        # TARGET_ADDED_HINTS は None
+
+    if changeGenerationLimit in (0, 2):
+        generationLimits = None
+    else:
+        # generationLimitsを設定する必要がある場合はここで設定
+        generationLimits = None  # 必要に応じて設定
+
+    # 各チャレンジ(ワーカープロセス)に渡す設定
+    challengeSettings = {
+        "maxNumber": maxNumber,
+        "solverBackends": SOLVER_BACKENDS,
+        "inputBoard": dataConvertedToNumbers['boardConvertedToNumber'],
+        "boardA": boardA,
+        "targetHintCount": TARGET_HINT_COUNT,
+        "maxSolutions": MAX_SOLUTIONS,
+        "changeGenerationLimit": changeGenerationLimit,
+        "generationLimits": generationLimits,
+        "stableWindow": STABLE_WINDOW,
+    }
+
+    if ALGORITHM_CHOICE != 1:
+        print("ALGORITHM_CHOICE が 1 以外は未対応です。")
+        challengeResults = iter(())
+    elif AddHintToLineTarget == 1:
+        # 対称性に基づいたヒント追加の処理（必要に応じて実装）
+        print("対称性に基づいたヒント追加は未対応です。")
+        challengeResults = iter(())
+    else:
+        # 解盤面Aからランダムにヒントを追加したチャレンジをNUMBER_OF_WORKERS個ずつ並列に実行する
+        challengeResults = runChallenges(challengeSettings, NUMBER_OF_WORKERS, TOTAL_LIMIT_TIME)
 
-    while True:
-        # 30分を超えたら終了
-        current_time = time.time()
-        if current_time - total_start_time > TOTAL_LIMIT_TIME:
-            print("30分を超えたため処理を終了します。")
-            break
+    # 終わったチャレンジから順に結果を集める
+    for _, selectedBoard, challengeTime, challengeResult in challengeResults:
+        problemExample, uniqueSolution, numberOfHintsAdded, solutionsPerIteration, timePerHint, newAddedHintInformation = challengeResult
 
         # チャレンジ回数を増やす
         challenge_count += 1
         print(f"\n=== {challenge_count}回目 ===")
-
-        # 唯一解の生成の開始時間
-        startTime = time.time()
-
-        # ランダムにヒントを追加する
-        if AddHintToLineTarget == 1:
-            # 対称性に基づいたヒント追加の処理（必要に応じて実装）
-            pass
-        else:
-            # ランダムにヒントを追加
-            selectedBoard = [[0 for _ in range(maxNumber)]
-                             for _ in range(maxNumber)]  # 空の盤面を作成
-            positions = [(i, j) for i in range(maxNumber)
-                         for j in range(maxNumber)]
-            random.shuffle(positions)
-
-            # 入力盤面のヒントを追加
-            hints_added = 0
-            for i in range(maxNumber):
-                for j in range(maxNumber):
-                    if dataConvertedToNumbers['boardConvertedToNumber'][i][j] != 0:
-                        selectedBoard[i][j] = dataConvertedToNumbers['boardConvertedToNumber'][i][j]
-                        hints_added += 1
-
-            # 残りのヒントをランダムに追加
-            for pos in positions:
-                if hints_added >= TARGET_HINT_COUNT:
-                    break
-                i, j = pos
-                if selectedBoard[i][j] == 0:
-                    selectedBoard[i][j] = boardA[i][j]
-                    hints_added += 1
-
-            selectedBoardName = "Random Hints"
-            print(
-                "対称性に基づいたヒント追加をスキップし、解盤面Aからランダムにヒントを追加しました。")
-            print(f"選ばれた盤面 : {selectedBoardName}")
-            printBoard(selectedBoard)
-
-        # maxNumberに応じた設定
-        if maxNumber == 9:
-            MAX_SOLUTIONS = 1000
-            # TARGET_ADDED_HINTS は既に設定済み
-        elif maxNumber == 16:
-            MAX_SOLUTIONS = None  # 上限盤面数を特に設定しない
-            # TARGET_ADDED_HINTS は None
-        elif maxNumber == 25:
-            MAX_SOLUTIONS = None  # 上限盤面数を特に設定しない
-            # TARGET_ADDED_HINTS は None
-        else:
-            MAX_SOLUTIONS = 100
-            # TARGET_ADDED_HINTS は None
-
-        if ALGORITHM_CHOICE == 1:
-            if changeGenerationLimit == 0:
-                generationLimits = None
-            else:
-                # generationLimitsを設定する必要がある場合はここで設定
-                generationLimits = None  # 必要に応じて設定
-
-            # selectedBoard のコピーを作成
-            currentBoard = [row[:] for row in selectedBoard]
-
-            problemExample, uniqueSolution, numberOfHintsAdded, solutionsPerIteration, timePerHint, newAddedHintInformation= generateUniqueSolutionG1(
-                currentBoard, MAX_SOLUTIONS, TOTAL_LIMIT_TIME - (current_time - total_start_time), changeGenerationLimit, generationLimits)
-            addedHintInformations.append(newAddedHintInformation)
-            endTime = time.time()
-
-            # チャレンジの情報を保存
-            challenge_times.append(endTime - startTime)
-            challenge_problem_examples.append(problemExample)
-            challenge_unique_solutions.append(uniqueSolution)
-            challenge_added_hints.append(numberOfHintsAdded)
-            challenge_solutions_per_iteration.append(solutionsPerIteration)
-            challenge_time_per_hint.append(timePerHint)
-
-            # 'problemExample' と 'uniqueSolution' が有効かどうかをチェック
-            if problemExample is not None and uniqueSolution is not None:
-                # 最良の盤面を更新
-                if min_added_hints is None or numberOfHintsAdded < min_added_hints:
-                    min_added_hints = numberOfHintsAdded
-                    best_problem_examples = [problemExample]
-                    best_unique_solutions = [uniqueSolution]
-                    best_solutions_per_iterations = [solutionsPerIteration]
-                    best_time_per_hints = [timePerHint]
-                elif numberOfHintsAdded == min_added_hints:
-                    best_problem_examples.append(problemExample)
-                    best_unique_solutions.append(uniqueSolution)
-                    best_solutions_per_iterations.append(solutionsPerIteration)
-                    best_time_per_hints.append(timePerHint)
-            else:
-                print("唯一解の生成に失敗しました。")
-
-            # EARLY_TERMINATION_ENABLED が 1 で、TARGET_ADDED_HINTS が設定されている場合の早期終了条件
-            if EARLY_TERMINATION_ENABLED == 1 and TARGET_ADDED_HINTS is not None:
-                if numberOfHintsAdded <= TARGET_ADDED_HINTS:
-                    print(
-                        f"追加ヒント数が {TARGET_ADDED_HINTS} 以下の盤面が見つかったため、処理を終了します。")
-                    break
-
+        print("選ばれた盤面 : Random Hints")
+        printBoard(selectedBoard)
+
+        addedHintInformations.append(newAddedHintInformation)
+
+        # チャレンジの情報を保存
+        challenge_times.append(challengeTime)
+        challenge_problem_examples.append(problemExample)
+        challenge_unique_solutions.append(uniqueSolution)
+        challenge_added_hints.append(numberOfHintsAdded)
+        challenge_solutions_per_iteration.append(solutionsPerIteration)
+        challenge_time_per_hint.append(timePerHint)
+
+        # 'problemExample' と 'uniqueSolution' が有効かどうかをチェック
+        if problemExample is not None and uniqueSolution is not None:
+            print(f"追加ヒント数: {numberOfHintsAdded}")
+            # 最良の盤面を更新
+            if min_added_hints is None or numberOfHintsAdded < min_added_hints:
+                min_added_hints = numberOfHintsAdded
+                best_problem_examples = [problemExample]
+                best_unique_solutions = [uniqueSolution]
+                best_solutions_per_iterations = [solutionsPerIteration]
+                best_time_per_hints = [timePerHint]
+            elif numberOfHintsAdded == min_added_hints:
+                best_problem_examples.append(problemExample)
+                best_unique_solutions.append(uniqueSolution)
+                best_solutions_per_iterations.append(solutionsPerIteration)
+                best_time_per_hints.append(timePerHint)
         else:
-            print("ALGORITHM_CHOICE が 1 以外は未対応です。")
-            break
+            print("唯一解の生成に失敗しました。")
+
+        # EARLY_TERMINATION_ENABLED が 1 で、TARGET_ADDED_HINTS が設定されている場合の早期終了条件
+        if EARLY_TERMINATION_ENABLED == 1 and TARGET_ADDED_HINTS is not None:
+            if problemExample is not None and numberOfHintsAdded <= TARGET_ADDED_HINTS:
+                print(
+                    f"追加ヒント数が {TARGET_ADDED_HINTS} 以下の盤面が見つかったため、処理を終了します。")
+                challengeResults.close()  # 実行中の他のチャレンジも止める
+                break
 
     # 最終的な結果を出力
     print("\n=== 最終結果 ===")
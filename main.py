@@ -6,13 +6,17 @@ from modules.ConvertToNumber import ConvertToNumber
 from modules.Validation import Validation
 from modules.AddHintToLineSymmetry import AddHintToLineSymmetry
 from modules.UnifiedNumberOfHints import UnifiedNumberOfHints
+from modules.SolverBackend import selectBackend
+from modules.Tracing import startTrace, stopTrace
+from modules.ProgressReporter import PROGRESS, configureProgress
 
 from modules.generateUniqueSolutionOriginal import generateUniqueSolutionOriginal
 from modules.generateUniqueSolutionG1 import generateUniqueSolutionG1
 from modules.generateUniqueSolutionG2 import generateUniqueSolutionG2
 from modules.generateUniqueSolutionG3 import generateUniqueSolutionG3
 
-from utility.generateSolutionBoardG import generateSolutionBoardG
+from utility.generateSolutionBoardB import generateSolutionBoardB
+from utility.addRandomHints import addRandomHints
 from utility.printBoard import printBoard
 
 
@@ -33,10 +37,37 @@ if __name__ == "__main__":
     AddHintToLineTarget = 0  
 
     # 0 : 毎回MAX_SOLUTIONS個生成．1:generationLimitsに格納された上限数をヒント追加ごとに設定
+    # 2 : 出現回数最小の(マス, 数字)がSTABLE_WINDOW個の解の間変わらなければ打ち切る(上限はMAX_SOLUTIONS)
     changeGenerationLimit = 0
+    STABLE_WINDOW = 30
+
+    # グリッドサイズごとの解盤面の列挙に使うソルバー
+    # "gurobi": Gurobi, "gurobiPersistent": Gurobi(ヒント追加ごとにモデルを作り直さない)
+    # "gurobiPool": Gurobi(解プールで1回のoptimizeでまとめて列挙)
+    # "gurobiReduced", "gurobiPoolReduced": 上記をヒントから確定するマスを除いた縮小モデルで解く
+    # "dancingLinks": Dancing Links, "bitmask": ビット集合の制約伝播(後者2つはGurobiライセンス不要)
+    # "bitmaskSampling", "gurobiSampling": 順番に列挙せず，ランダムに解き直して偏りの少ない解盤面を集める
+    # "bitmaskCube", "gurobiCube": 盤面をキューブに分けて複数プロセスで同時に列挙する(16×16, 25×25向け)
+    # "gurobiCached", "bitmaskCached": 列挙結果を盤面ごとにリポジトリ直下のsolveCache.sqlite3へ保存し，同じ盤面では再利用する
+    SOLVER_BACKENDS = {9: "gurobi", 16: "gurobi", 25: "gurobi"}
 
     LIMIT_TIME = 6000000000000000000
 
+    # G1, G3の途中状態を保存するファイル(Noneなら保存しない)．ファイルがあればその続きから再開する
+    # 同じ入力(INPUT_FILE, INPUT_KEY)なら，ランダムに追加したヒントも保存した盤面のものを使う
+    CHECKPOINT_FILE = None
+    CHECKPOINT_INTERVAL = 60  # 保存する間隔(秒)
+
+    # 生成ループの段階ごとの所要時間を1行1イベントのJSONで追記するファイル(Noneなら記録しない)
+    TRACE_FILE = None
+
+    # 途中経過の表示．QUIET: なし, RESULT: 結果とエラーのみ, PROGRESS: 各ステップの経過, VERBOSE: 途中の盤面も表示
+    # (PROGRESS以外を使う場合はmodules.ProgressReporterからimportする)
+    # 解ごとの「解 n」はPROGRESS_INTERVAL秒に1回までに間引く(0なら毎回表示)
+    PROGRESS_LEVEL = PROGRESS
+    PROGRESS_INTERVAL = 1.0
+    configureProgress(PROGRESS_LEVEL, PROGRESS_INTERVAL)
+
     if '9' in INPUT_FILE:
         MAX_SOLUTIONS = 1000
         TARGET_HINT_COUNT = 16
@@ -68,6 +99,9 @@ if __name__ == "__main__":
     board = sudokuProblem["board"]
     maxNumber = sudokuProblem["maxNumber"]
 
+    # 盤面サイズに応じたソルバーを選択
+    solverBackend = selectBackend(maxNumber, SOLVER_BACKENDS)
+
     # 入力盤面を表示
     print("入力盤面:")
     printBoard(board)
@@ -85,11 +119,11 @@ if __name__ == "__main__":
     else:
         print("バリデーション成功")
 
-    # generateSolutionBoard関数を使用して解盤面Aを取得
+    # ビット集合の制約伝播ソルバーで解盤面Aを取得
     boardA = [row[:]
               for row in dataConvertedToNumbers['boardConvertedToNumber']]
 
-    isSolutionGenerated = generateSolutionBoardG(boardA)
+    isSolutionGenerated = generateSolutionBoardB(boardA)
 
     if not isSolutionGenerated:
         print("解盤面Aの生成に失敗しました。")
@@ -157,28 +191,9 @@ if __name__ == "__main__":
         # 対称性に基づいたヒント追加をスキップし、ランダムにヒントを追加
 
         if(defaultValue==1) : 
-            selectedBoard = [[0 for _ in range(maxNumber)]
-                            for _ in range(maxNumber)]  # 空の盤面を作成
-            positions = [(i, j) for i in range(maxNumber)
-                        for j in range(maxNumber)]
-            random.shuffle(positions)
-
-            # 入力盤面のヒントを追加
-            hints_added = 0
-            for i in range(maxNumber):
-                for j in range(maxNumber):
-                    if dataConvertedToNumbers['boardConvertedToNumber'][i][j] != 0:
-                        selectedBoard[i][j] = dataConvertedToNumbers['boardConvertedToNumber'][i][j]
-                        hints_added += 1
-
-            # 残りのヒントをランダムに追加
-            for pos in positions:
-                if hints_added >= TARGET_HINT_COUNT:
-                    break
-                i, j = pos
-                if selectedBoard[i][j] == 0:
-                    selectedBoard[i][j] = boardA[i][j]
-                    hints_added += 1
+            # 入力盤面のヒントに，解盤面Aからランダムにヒントを追加
+            selectedBoard = addRandomHints(
+                dataConvertedToNumbers['boardConvertedToNumber'], boardA, TARGET_HINT_COUNT)
 
             selectedBoardName = "Random Hints"
             print("対称性に基づいたヒント追加をスキップし、解盤面Aからランダムにヒントを追加しました。")
@@ -206,31 +221,37 @@ if __name__ == "__main__":
             printBoard(selectedBoard)
 
     # 唯一解の生成
+    if TRACE_FILE is not None:
+        startTrace(TRACE_FILE)
     startTime = time.time()
 
     if ALGORITHM_CHOICE == 0:
         problemExample, uniqueSolution, numberOfHintsAdded, solutionsPerIteration = generateUniqueSolutionOriginal(
-            selectedBoard, MAX_SOLUTIONS, LIMIT_TIME)
+            selectedBoard, MAX_SOLUTIONS, LIMIT_TIME, solverBackend)
         numberOfGeneratedBoards = solutionsPerIteration  # 変数名を統一
         numberOfReusedSolutions = [0] * \
             len(solutionsPerIteration)  # 再利用した解の数は0
     elif ALGORITHM_CHOICE == 1:  # 問題例,解盤面,追加したヒントの数,再利用した解盤面数
         problemExample, uniqueSolution, numberOfHintsAdded, solutionsPerIteration, timePerHint, addedHintInformation = generateUniqueSolutionG1(
-            selectedBoard, MAX_SOLUTIONS, LIMIT_TIME, changeGenerationLimit, generationLimits)
+            selectedBoard, MAX_SOLUTIONS, LIMIT_TIME, changeGenerationLimit, generationLimits, solverBackend, STABLE_WINDOW,
+            CHECKPOINT_FILE, CHECKPOINT_INTERVAL, dataConvertedToNumbers['boardConvertedToNumber'])
         numberOfGeneratedBoards = solutionsPerIteration  # 変数名を統一
         numberOfReusedSolutions = [0] * \
             len(solutionsPerIteration)  # 再利用した解の数は0
     elif ALGORITHM_CHOICE == 2:
         problemExample, uniqueSolution, numberOfHintsAdded, solutionsPerIteration = generateUniqueSolutionG2(
-            selectedBoard, MAX_SOLUTIONS, LIMIT_TIME)
+            selectedBoard, MAX_SOLUTIONS, LIMIT_TIME, solverBackend)
         numberOfGeneratedBoards = solutionsPerIteration  # 変数名を統一
         numberOfReusedSolutions = [0] * \
             len(solutionsPerIteration)  # 再利用した解の数は0
     elif ALGORITHM_CHOICE == 3:  # 問題例,解盤面,追加したヒントの数,再利用した解盤面数
         problemExample, uniqueSolution, numberOfHintsAdded, numberOfGeneratedBoards, numberOfReusedSolutions = generateUniqueSolutionG3(
-            selectedBoard, MAX_SOLUTIONS, LIMIT_TIME)
+            selectedBoard, MAX_SOLUTIONS, LIMIT_TIME, solverBackend, CHECKPOINT_FILE, CHECKPOINT_INTERVAL,
+            dataConvertedToNumbers['boardConvertedToNumber'])
 
     endTime = time.time()
+    stopTrace()
+    solverBackend.close()  # ソルバーのワーカープロセス(gurobiCube, bitmaskCube)などを片付ける
 
     if uniqueSolution:
         print("\n******************************************")
@@ -0,0 +1,153 @@
+import contextlib
+import io
+import json
+import random
+import time
+from multiprocessing import Pool
+
+from modules.Canonicalization import canonicalBoardKey
+from modules.ProgressReporter import QUIET, configureProgress
+from modules.ConvertToNumber import ConvertToNumber
+from modules.Validation import Validation
+from modules.SolverBackend import selectBackend
+from modules.generateUniqueSolutionOriginal import generateUniqueSolutionOriginal
+from modules.generateUniqueSolutionG1 import generateUniqueSolutionG1
+from modules.generateUniqueSolutionG2 import generateUniqueSolutionG2
+from modules.generateUniqueSolutionG3 import generateUniqueSolutionG3
+from utility.generateSolutionBoardB import generateSolutionBoardB
+from utility.addRandomHints import addRandomHints
+
+# グリッドサイズごとの既定値 (MAX_SOLUTIONS, TARGET_HINT_COUNT)．main.pyと同じ値
+DEFAULT_SETTINGS = {9: (1000, 16), 16: (300, 51), 25: (20, 250)}
+
+
+def loadJobs(inputFiles, keys, count):
+    # (ファイル, キー, 何個目か) のジョブを作る．keysがNoneならファイル内の全てのキー
+    jobs = []
+    for inputFile in inputFiles:
+        with open(inputFile, 'r', encoding="utf-8") as file:
+            data = json.load(file)
+        for key in (keys if keys is not None else data["inputs"]):
+            if key not in data["inputs"]:
+                continue
+            for repetition in range(count):
+                jobs.append({"inputFile": inputFile, "inputKey": key, "repetition": repetition,
+                             "sudokuProblem": data["inputs"][key]})
+    return jobs
+
+
+def dedupeJobs(jobs):
+    # 対称性(転置・行列の並べ替え・数字の付け替え)で同じになる入力盤面は最初の1つだけ残す
+    # 戻り値: (残したジョブ, 飛ばしたジョブと同じ盤面のジョブの組のリスト)
+    firstJobs = {}
+    keptJobs = []
+    skippedJobs = []
+    for job in jobs:
+        sudokuProblem = job["sudokuProblem"]
+        maxNumber = sudokuProblem["maxNumber"]
+        board = ConvertToNumber(sudokuProblem["board"], maxNumber).getConvertedData()['boardConvertedToNumber']
+        if max(max(row) for row in board) > maxNumber:
+            keptJobs.append(job)  # 文字の種類が多すぎる盤面はそのまま残す(生成時のバリデーションで失敗する)
+            continue
+        key = (canonicalBoardKey(board), job["repetition"])
+        if key in firstJobs:
+            skippedJobs.append((job, firstJobs[key]))
+        else:
+            firstJobs[key] = job
+            keptJobs.append(job)
+    return keptJobs, skippedJobs
+
+
+def generatePuzzle(sudokuProblem, settings, solverBackend=None):
+    # 1つの入力盤面から唯一解の問題を1つ作る(main.pyのランダムヒント追加と同じ手順)
+    # 戻り値: 結果の辞書．失敗した場合は "error" に理由を入れる
+    # solverBackendを省略した場合はsettings["solverBackends"]からサイズに応じて作る
+    maxNumber = sudokuProblem["maxNumber"]
+    maxSolutions, targetHintCount = DEFAULT_SETTINGS.get(maxNumber, (10, 200))
+    maxSolutions = settings["maxSolutions"] or maxSolutions
+    targetHintCount = settings["targetHintCount"] or targetHintCount
+    if solverBackend is None:
+        solverBackend = selectBackend(maxNumber, settings["solverBackends"])
+        try:
+            return generatePuzzle(sudokuProblem, settings, solverBackend)
+        finally:
+            solverBackend.close()  # ここで作ったソルバーのワーカープロセスなどを片付ける
+
+    converter = ConvertToNumber(sudokuProblem["board"], maxNumber)
+    dataConvertedToNumbers = converter.getConvertedData()
+    validator = Validation(
+        dataConvertedToNumbers['charToNumberMap'], dataConvertedToNumbers['boardConvertedToNumber'], maxNumber)
+    if not validator.check():
+        return {"error": "バリデーション失敗"}
+
+    boardA = [row[:] for row in dataConvertedToNumbers['boardConvertedToNumber']]
+    if not generateSolutionBoardB(boardA):
+        return {"error": "解盤面Aの生成に失敗しました"}
+    selectedBoard = addRandomHints(dataConvertedToNumbers['boardConvertedToNumber'], boardA, targetHintCount)
+
+    algorithmChoice = settings["algorithmChoice"]
+    limitTime = settings["limitTime"]
+    timePerHint = None
+    startTime = time.time()
+    if algorithmChoice == 0:
+        problemExample, uniqueSolution, numberOfHintsAdded, numberOfGeneratedBoards = generateUniqueSolutionOriginal(
+            selectedBoard, maxSolutions, limitTime, solverBackend)
+    elif algorithmChoice == 1:
+        problemExample, uniqueSolution, numberOfHintsAdded, numberOfGeneratedBoards, timePerHint, _ = generateUniqueSolutionG1(
+            selectedBoard, maxSolutions, limitTime, settings["changeGenerationLimit"], settings["generationLimits"],
+            solverBackend, settings["stableWindow"])
+    elif algorithmChoice == 2:
+        # G2は失敗時に (None, 追加したヒントの数, 生成された解の数のリスト, 解の数) を返す
+        result = generateUniqueSolutionG2(selectedBoard, maxSolutions, limitTime, solverBackend)
+        if result[0] is not None:
+            problemExample, uniqueSolution, numberOfHintsAdded, numberOfGeneratedBoards = result
+        else:
+            problemExample, uniqueSolution = None, None
+            numberOfHintsAdded, numberOfGeneratedBoards = result[1], result[2]
+    else:
+        problemExample, uniqueSolution, numberOfHintsAdded, numberOfGeneratedBoards, _ = generateUniqueSolutionG3(
+            selectedBoard, maxSolutions, limitTime, solverBackend)
+    generationTime = time.time() - startTime
+
+    if uniqueSolution is None:
+        return {"error": "唯一解の生成に失敗しました", "generationTime": generationTime,
+                "numberOfHintsAdded": numberOfHintsAdded}
+    return {
+        "problem": converter.convertBack(problemExample),
+        "solution": converter.convertBack(uniqueSolution),
+        "numberOfHintsAdded": numberOfHintsAdded,
+        "numberOfGeneratedBoards": numberOfGeneratedBoards,
+        "timePerHint": timePerHint,
+        "generationTime": generationTime,
+    }
+
+
+def runJob(task, generate=generatePuzzle):
+    # ワーカープロセスで1つのジョブを実行する．生成中の表示は作らずに捨てる
+    job, settings, seed = task
+    random.seed(seed)
+    configureProgress(QUIET)
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            result = generate(job["sudokuProblem"], settings)
+        except Exception as error:  # 1つのジョブの失敗でバッチ全体を止めない
+            result = {"error": f"{type(error).__name__}: {error}"}
+    result.update(inputFile=job["inputFile"], inputKey=job["inputKey"], repetition=job["repetition"])
+    return result
+
+
+def runBatch(jobs, settings, numberOfWorkers, seed=None):
+    # ジョブをnumberOfWorkers個のプロセスで実行し，終わった順に結果を返すジェネレータ
+    seedGenerator = random.Random(seed)
+    tasks = [(job, settings, seedGenerator.randrange(2 ** 32)) for job in jobs]
+    if numberOfWorkers <= 1:
+        for task in tasks:
+            yield runJob(task)
+        return
+
+    pool = Pool(numberOfWorkers)
+    try:
+        yield from pool.imap_unordered(runJob, tasks)
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,196 @@
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+from multiprocessing import get_context
+
+from modules.BatchRunner import generatePuzzle, runJob
+from modules.SolverBackend import SolverBackend, selectBackend
+
+# ベンチマークで使う入力ファイル(リポジトリに入っているもの)
+DEFAULT_INPUT_FILES = ["input9.json", "input16.json", "input25.json"]
+ALGORITHM_NAMES = {0: "Original", 1: "G1", 2: "G2", 3: "G3"}
+# ベースラインと比べる指標と，回帰とみなさない絶対的な差(小さい値の揺れを無視する)
+COMPARED_METRICS = {"wallTime": 0.05, "timePerHint": 0.01, "solverCalls": 0, "peakRssMB": 5}
+
+
+def gurobiOptimizeCallCount():
+    # このプロセスでのGurobiのoptimize()の回数(Gurobiを使っていなければ0)
+    gurobiBackend = sys.modules.get("modules.GurobiBackend")
+    return gurobiBackend.optimizeCallCount if gurobiBackend is not None else 0
+
+
+class CountingBackend(SolverBackend):
+    # 元のソルバーでの探索の回数と，返した解盤面の数を数える
+    # 探索は「次の解を1つ探す」1回ずつ(列挙の最後の，解が見つからなかった探索も含む)，completeBoard，唯一解判定
+    def __init__(self, baseBackend):
+        self.baseBackend = baseBackend
+        self.name = baseBackend.name
+        self.searches = 0
+        self.generatedSolutions = 0
+        self.initialOptimizeCalls = gurobiOptimizeCallCount()
+
+    @property
+    def solverCalls(self):
+        # Gurobiを使った場合は実際のoptimize()の回数(解プールでは1回で複数の解が出るため)．それ以外は探索の回数
+        optimizeCalls = gurobiOptimizeCallCount() - self.initialOptimizeCalls
+        return optimizeCalls if optimizeCalls > 0 else self.searches
+
+    def countSearches(self, solutionStream):
+        # 解を1つ取り出すごとに1回．途中でclose()された場合は，取り出されなかった次の探索は数えない
+        self.searches += 1
+        for solution in solutionStream:
+            self.generatedSolutions += 1
+            yield solution
+            self.searches += 1
+
+    def generateSolutions(self, board, limit=None, excludedSolutions=None):
+        return self.countSearches(self.baseBackend.generateSolutions(board, limit, excludedSolutions))
+
+    def sampleSolutions(self, board):
+        return self.countSearches(self.baseBackend.sampleSolutions(board))
+
+    def completeBoard(self, board):
+        self.searches += 1
+        return self.baseBackend.completeBoard(board)
+
+    def createUniquenessOracle(self, board, currentSolution):
+        return CountingOracle(self, self.baseBackend.createUniquenessOracle(board, currentSolution))
+
+    def setThreads(self, threads):
+        self.baseBackend.setThreads(threads)
+
+    def close(self):
+        self.baseBackend.close()
+
+
+class CountingOracle:
+    # 唯一解判定1回をソルバー呼び出し1回として数える
+    def __init__(self, countingBackend, baseOracle):
+        self.countingBackend = countingBackend
+        self.baseOracle = baseOracle
+
+    def addHint(self, i, j, value):
+        self.baseOracle.addHint(i, j, value)
+
+    def isUnique(self):
+        self.countingBackend.searches += 1
+        return self.baseOracle.isUnique()
+
+
+def caseSeed(seed, inputFile, inputKey, repetition):
+    # (入力, 何回目か) ごとに決まるシード．アルゴリズムによらず同じなので，同じ盤面で比べられる
+    return random.Random(f"{seed}:{os.path.basename(inputFile)}:{inputKey}:{repetition}").randrange(2 ** 32)
+
+
+def runCase(task):
+    # 1つのケースを(呼び出し元が用意した)新しいプロセスで実行し，指標を返す
+    job, settings, seed = task
+    counters = {}
+
+    def generateCounted(sudokuProblem, caseSettings):
+        solverBackend = CountingBackend(selectBackend(sudokuProblem["maxNumber"], caseSettings["solverBackends"]))
+        counters["backend"] = solverBackend
+        return generatePuzzle(sudokuProblem, caseSettings, solverBackend)
+
+    result = runJob((job, settings, seed), generateCounted)
+    countingBackend = counters.get("backend")
+    numberOfHintsAdded = result.get("numberOfHintsAdded")
+    wallTime = result.get("generationTime")
+    generatedSolutions = countingBackend.generatedSolutions if countingBackend else 0
+    return {
+        "algorithm": ALGORITHM_NAMES[settings["algorithmChoice"]],
+        "inputFile": os.path.basename(job["inputFile"]),
+        "inputKey": job["inputKey"],
+        "repetition": job["repetition"],
+        "seed": seed,
+        "success": "error" not in result,
+        "error": result.get("error"),
+        "wallTime": wallTime,
+        "numberOfHintsAdded": numberOfHintsAdded,
+        "timePerHint": wallTime / numberOfHintsAdded if wallTime is not None and numberOfHintsAdded else None,
+        "solverCalls": countingBackend.solverCalls if countingBackend else 0,
+        "generatedSolutions": generatedSolutions,
+        "solutionsPerSecond": generatedSolutions / wallTime if wallTime else None,
+        # Linuxではキロバイト単位(このプロセスでの最大値)
+        "peakRssMB": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def runBenchmark(jobs, settingsList, seed=0):
+    # 全ての (アルゴリズムの設定, ジョブ) を1つずつ新しいプロセスで実行し，終わった順に結果を返す
+    # プロセスを分けるのは，ピークメモリを測るためと，前のケースのキャッシュの影響をなくすため
+    tasks = [(job, settings, caseSeed(seed, job["inputFile"], job["inputKey"], job["repetition"]))
+             for settings in settingsList for job in jobs]
+    pool = get_context("spawn").Pool(1, maxtasksperchild=1)
+    try:
+        yield from pool.imap(runCase, tasks)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def median(values):
+    values = [value for value in values if value is not None]
+    return statistics.median(values) if values else None
+
+
+def summarizeRuns(runs):
+    # (アルゴリズム, 入力) ごとに繰り返しの中央値をまとめる
+    cases = {}
+    for run in runs:
+        cases.setdefault(caseName(run), []).append(run)
+    summary = {}
+    for name, caseRuns in cases.items():
+        succeeded = [run for run in caseRuns if run["success"]]
+        summary[name] = {
+            "repetitions": len(caseRuns),
+            "successRate": len(succeeded) / len(caseRuns),
+            **{metric: median([run[metric] for run in succeeded])
+               for metric in ("wallTime", "timePerHint", "solverCalls", "solutionsPerSecond",
+                              "numberOfHintsAdded", "peakRssMB")},
+        }
+    return summary
+
+
+def caseName(run):
+    return f"{run['algorithm']}/{run['inputFile']}/{run['inputKey']}"
+
+
+def compareWithBaseline(summary, baseline, tolerance):
+    # ベースラインより(1 + tolerance)倍を超えて悪くなった指標を回帰として返す
+    # 戻り値: [(ケース名, 指標, ベースラインの値, 今回の値), ...]
+    regressions = []
+    for name, current in summary.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["successRate"] < previous["successRate"]:
+            regressions.append((name, "successRate", previous["successRate"], current["successRate"]))
+        for metric, minimumDifference in COMPARED_METRICS.items():
+            if current[metric] is None or previous.get(metric) is None:
+                continue
+            if (current[metric] > previous[metric] * (1 + tolerance)
+                    and current[metric] - previous[metric] > minimumDifference):
+                regressions.append((name, metric, previous[metric], current[metric]))
+    return regressions
+
+
+def environmentInfo():
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpuCount": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def saveReport(path, settingsList, runs, summary):
+    report = {"environment": environmentInfo(), "settings": settingsList, "runs": runs, "summary": summary}
+    with open(path, 'w', encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+def loadSummary(path):
+    with open(path, 'r', encoding="utf-8") as file:
+        return json.load(file)["summary"]
@@ -0,0 +1,175 @@
+import random
+
+
+class BitmaskSolver:
+    # マスごとの候補数字をビット集合で持つ数独ソルバー
+    # 数字vはビット (1 << (v - 1)) で表す
+    # 単一候補(naked single)・隠れた単一候補(hidden single)の伝播と，
+    # 候補数最小のマスから分岐するバックトラック(MRV)で解を求める
+    def __init__(self, board, rng=None):
+        self.size = len(board)
+        self.blockSize = int(self.size ** 0.5)
+        self.fullMask = (1 << self.size) - 1
+        self.rng = rng if rng is not None else random
+        self.isInfeasible = False  # ヒント同士が矛盾している場合True
+
+        size = self.size
+        self.units, self.peers, self.popCount = self.getStructure(size)
+
+        # 盤面の状態: [マスの値, マスの候補のビット集合]
+        self.state = [[0] * (size * size), [self.fullMask] * (size * size)]
+        for i in range(size):
+            for j in range(size):
+                value = board[i][j]
+                if value == 0:
+                    continue
+                cell = i * size + j
+                if not self.state[1][cell] & (1 << (value - 1)):
+                    self.isInfeasible = True
+                    return
+                self.place(self.state, cell, 1 << (value - 1))
+
+    structures = {}  # サイズごとのユニットと関連マスのキャッシュ
+
+    @classmethod
+    def getStructure(cls, size):
+        # 行・列・ブロックに含まれるマスの一覧，各マスと同じユニットに属する他のマス，
+        # ビット数の表(16×16以下のみ．それより大きい場合はNone)を返す
+        if size not in cls.structures:
+            blockSize = int(size ** 0.5)
+            units = [[i * size + j for j in range(size)] for i in range(size)]
+            units += [[i * size + j for i in range(size)] for j in range(size)]
+            for bi in range(blockSize):
+                for bj in range(blockSize):
+                    units.append([i * size + j
+                                  for i in range(bi * blockSize, (bi + 1) * blockSize)
+                                  for j in range(bj * blockSize, (bj + 1) * blockSize)])
+
+            peerSets = [set() for _ in range(size * size)]
+            for unit in units:
+                for cell in unit:
+                    peerSets[cell].update(unit)
+            peers = []
+            for cell, peerSet in enumerate(peerSets):
+                peerSet.discard(cell)
+                peers.append(sorted(peerSet))
+            popCount = None
+            if size <= 16:
+                popCount = [0] * (1 << size)
+                for mask in range(1, 1 << size):
+                    popCount[mask] = popCount[mask >> 1] + (mask & 1)
+            cls.structures[size] = (units, peers, popCount)
+        return cls.structures[size]
+
+    def place(self, state, cell, bit, queue=None):
+        # マスに数字を置き，同じ行・列・ブロックの候補から取り除く
+        # 候補が1つ以下になったマスはqueueに積む
+        grid, candidates = state
+        grid[cell] = bit.bit_length()
+        candidates[cell] = 0
+        for peer in self.peers[cell]:
+            candidateMask = candidates[peer]
+            if candidateMask & bit:
+                candidateMask ^= bit
+                candidates[peer] = candidateMask
+                if queue is not None and candidateMask & (candidateMask - 1) == 0:
+                    queue.append(peer)
+
+    def propagate(self, state, queue=None):
+        # 単一候補と隠れた単一候補を確定できなくなるまで繰り返す．矛盾したらFalse
+        # queueには候補が1つ以下になった可能性のあるマスを渡す(Noneなら全マスを調べる)
+        grid, candidates = state
+        fullMask = self.fullMask
+        if queue is None:
+            # 単一候補: 候補が1つしかないマス(埋まったマスの候補は0)
+            queue = [cell for cell, candidateMask in enumerate(candidates)
+                     if candidateMask & (candidateMask - 1) == 0 and grid[cell] == 0]
+        while True:
+            while queue:
+                cell = queue.pop()
+                if grid[cell] != 0:
+                    continue
+                candidateMask = candidates[cell]
+                if candidateMask == 0:
+                    return False
+                self.place(state, cell, candidateMask, queue)
+
+            # 隠れた単一候補: ユニット内で置ける場所が1つしかない数字
+            for unit in self.units:
+                usedMask = 0
+                seenOnce = 0
+                seenTwice = 0
+                for cell in unit:
+                    candidateMask = candidates[cell]
+                    if candidateMask == 0:
+                        usedMask |= 1 << (grid[cell] - 1)
+                    else:
+                        seenTwice |= seenOnce & candidateMask
+                        seenOnce |= candidateMask
+                if (seenOnce | usedMask) != fullMask:
+                    return False  # 置き場所のない数字がある
+                singles = seenOnce & ~seenTwice
+                while singles:
+                    bit = singles & -singles
+                    singles ^= bit
+                    for cell in unit:
+                        if candidates[cell] & bit:
+                            self.place(state, cell, bit, queue)
+                            break
+                    else:
+                        return False
+                if queue:
+                    break
+            if not queue:
+                return True
+
+    def generateSolutions(self, limit=None, randomize=False):
+        # 解盤面を1つずつ返すジェネレータ．randomize=Trueなら数字を試す順番をランダムにする
+        if self.isInfeasible:
+            return
+        solutionCount = 0
+        stack = [([list(part) for part in self.state], None)]
+        while stack:
+            state, queue = stack.pop()
+            if not self.propagate(state, queue):
+                continue
+
+            # 候補数が最も少ない空きマスを選ぶ(MRV)
+            grid, candidates = state
+            popCount = self.popCount
+            bestCell = -1
+            bestCount = self.size + 1
+            bestMask = 0
+            for cell, candidateMask in enumerate(candidates):
+                if candidateMask == 0:  # 伝播後の空きマスは必ず候補を2つ以上持つ
+                    continue
+                count = popCount[candidateMask] if popCount else bin(candidateMask).count("1")
+                if count < bestCount:
+                    bestCell, bestCount, bestMask = cell, count, candidateMask
+                    if count == 2:
+                        break
+
+            if bestCell < 0:  # 全てのマスが埋まった
+                yield [grid[i * self.size:(i + 1) * self.size] for i in range(self.size)]
+                solutionCount += 1
+                if limit is not None and solutionCount >= limit:
+                    return
+                continue
+
+            bits = []
+            while bestMask:
+                bit = bestMask & -bestMask
+                bestMask ^= bit
+                bits.append(bit)
+            if randomize:
+                self.rng.shuffle(bits)
+            # スタックなので後から積んだものが先に試される
+            for bit in reversed(bits):
+                child = [list(part) for part in state]
+                childQueue = []
+                self.place(child, bestCell, bit, childQueue)
+                stack.append((child, childQueue))
+
+    def solve(self, randomize=True):
+        # 解盤面を1つ返す．解が存在しなければNone
+        return next(self.generateSolutions(1, randomize), None)
@@ -0,0 +1,161 @@
+import hashlib
+from itertools import permutations, product
+from math import factorial
+
+import numpy as np
+
+# 数独の対称性(転置，バンド・スタックの並べ替え，バンド内の行・スタック内の列の並べ替え，数字の付け替え)で
+# 同じになる盤面を1つの代表(正規形)にそろえる
+#
+# 変換 (isTransposed, rowOrder, columnOrder, digitMap) は
+#   正規形[r][c] = digitMap[T[rowOrder[r]][columnOrder[c]]]  (T は isTransposed なら転置した盤面)
+# を表す．digitMap[0] = 0 (空きマス)
+#
+# 行・列の並べ替えは，数字の付け替えに依らない特徴量(色)で並べてから，
+# 同じ色の並べ替えだけを全て試し，数字を出現順に付け替えた盤面が辞書順最小のものを選ぶ
+# 同じ色の組み合わせがmaxCandidatesを超える場合は並べ替えを試さない(変換は正しいが，
+# 対称な盤面同士が同じ正規形にならないことがある)
+
+
+def refineColors(board, digitCount, iterations=2):
+    # 行と列の色: 各マスの数字の出現回数と，交差する列(行)の色から決める
+    size = len(board)
+    filled = board != 0
+    cellWeight = np.where(filled, digitCount[board], 0)
+    rowColors = [tuple(sorted(cellWeight[i][filled[i]])) for i in range(size)]
+    columnColors = [tuple(sorted(cellWeight[:, j][filled[:, j]])) for j in range(size)]
+    rowColors, columnColors = compressColors(rowColors), compressColors(columnColors)
+    for _ in range(iterations):
+        newRowColors = [(rowColors[i], tuple(sorted((columnColors[j], cellWeight[i, j])
+                                                    for j in range(size) if filled[i, j])))
+                        for i in range(size)]
+        newColumnColors = [(columnColors[j], tuple(sorted((rowColors[i], cellWeight[i, j])
+                                                          for i in range(size) if filled[i, j])))
+                           for j in range(size)]
+        rowColors, columnColors = compressColors(newRowColors), compressColors(newColumnColors)
+    return rowColors, columnColors
+
+
+def compressColors(keys):
+    # 色を小さい整数にする(キーの大小順なので盤面の並べ替えに依らない)
+    ranks = {key: rank for rank, key in enumerate(sorted(set(keys)))}
+    return [ranks[key] for key in keys]
+
+
+def orderCandidates(colors, blockSize):
+    # バンド(スタック)を色で並べ，その中の行(列)も色で並べる
+    # 戻り値: (並べたバンド, 色が同じバンドのまとまり, バンドごとの色が同じ行のまとまり, 並べ替えの候補数)
+    bands = []
+    for band in range(blockSize):
+        rows = sorted(range(band * blockSize, (band + 1) * blockSize), key=lambda row: colors[row])
+        bands.append((tuple(sorted(colors[row] for row in rows)), rows))
+    bands.sort(key=lambda band: band[0])
+
+    # 色が同じバンド・行のまとまり(この中の並べ替えは全て試す)
+    bandGroups = groupEqual([band[0] for band in bands])
+    rowGroups = [groupEqual([colors[row] for row in rows]) for _, rows in bands]
+    candidateCount = 1
+    for group in bandGroups:
+        candidateCount *= factorial(len(group))
+    for groups in rowGroups:
+        for group in groups:
+            candidateCount *= factorial(len(group))
+    return bands, bandGroups, rowGroups, candidateCount
+
+
+def groupEqual(keys):
+    # 並んだキーのうち等しいものの位置のまとまり
+    groups = []
+    for index, key in enumerate(keys):
+        if groups and keys[groups[-1][0]] == key:
+            groups[-1].append(index)
+        else:
+            groups.append([index])
+    return groups
+
+
+def permuteGroups(items, groups):
+    # groupsのまとまりの中だけを並べ替えた全ての並びを返す
+    choices = [list(permutations([items[index] for index in group])) for group in groups]
+    for choice in product(*choices):
+        yield [item for part in choice for item in part]
+
+
+def iterateOrders(bands, bandGroups, rowGroups, expand):
+    # 行(列)の順番の候補を全て返す．expand=Falseなら色で並べた1通りだけ
+    if not expand:
+        yield [row for _, rows in bands for row in rows]
+        return
+    for bandOrder in permuteGroups(list(range(len(bands))), bandGroups):
+        rowChoices = [list(permuteGroups(bands[band][1], rowGroups[band])) for band in bandOrder]
+        for rowChoice in product(*rowChoices):
+            yield [row for rows in rowChoice for row in rows]
+
+
+def relabelDigits(board):
+    # 数字を左上からの出現順に1, 2, ...と付け替える．戻り値: (付け替えた盤面, digitMap)
+    size = len(board)
+    values = board.ravel()
+    filledValues = values[values != 0]
+    _, firstIndices = np.unique(filledValues, return_index=True)
+    appearanceOrder = filledValues[np.sort(firstIndices)]
+    digitMap = np.zeros(size + 1, dtype=np.int64)
+    digitMap[appearanceOrder] = np.arange(1, len(appearanceOrder) + 1)
+    # 盤面にない数字は残りの番号を小さい順に割り当てる
+    unusedDigits = [digit for digit in range(1, size + 1) if digitMap[digit] == 0]
+    digitMap[unusedDigits] = np.arange(len(appearanceOrder) + 1, size + 1)
+    return digitMap[board], digitMap
+
+
+def canonicalizeBoard(board, maxCandidates=1024):
+    # 戻り値: (正規形の盤面(二次元リスト), 変換)
+    size = len(board)
+    blockSize = int(size ** 0.5)
+    original = np.asarray(board, dtype=np.int64)
+    digitCount = np.bincount(original.ravel(), minlength=size + 1)
+    digitCount[0] = 0
+
+    best = None
+    for isTransposed in (False, True):
+        oriented = original.T if isTransposed else original
+        rowColors, columnColors = refineColors(oriented, digitCount)
+        rowCandidates = orderCandidates(rowColors, blockSize)
+        columnCandidates = orderCandidates(columnColors, blockSize)
+        # 行と列の組み合わせがmaxCandidates以下なら全て試す
+        expand = rowCandidates[3] * columnCandidates[3] <= maxCandidates
+        rowOrders = list(iterateOrders(*rowCandidates[:3], expand))
+        columnOrders = list(iterateOrders(*columnCandidates[:3], expand))
+        for rowOrder in rowOrders:
+            rowsPermuted = oriented[rowOrder]
+            for columnOrder in columnOrders:
+                relabeled, digitMap = relabelDigits(rowsPermuted[:, columnOrder])
+                key = relabeled.tobytes()
+                if best is None or key < best[0]:
+                    best = (key, relabeled, (isTransposed, list(rowOrder), list(columnOrder), digitMap.tolist()))
+    return best[1].tolist(), best[2]
+
+
+def canonicalBoardKey(board, maxCandidates=1024):
+    # 正規形のハッシュ(対称な盤面同士で同じになる)
+    canonicalBoard, _ = canonicalizeBoard(board, maxCandidates)
+    return hashlib.sha256(np.asarray(canonicalBoard, dtype=np.uint8).tobytes()).hexdigest()
+
+
+def applyTransform(board, transform):
+    # 元の盤面(またはその解盤面)を正規形の側に写す
+    isTransposed, rowOrder, columnOrder, digitMap = transform
+    oriented = np.asarray(board, dtype=np.int64)
+    if isTransposed:
+        oriented = oriented.T
+    return np.asarray(digitMap)[oriented[rowOrder][:, columnOrder]].tolist()
+
+
+def invertTransform(board, transform):
+    # 正規形の側の盤面(またはその解盤面)を元の盤面の側に戻す
+    isTransposed, rowOrder, columnOrder, digitMap = transform
+    inverseDigitMap = np.zeros(len(digitMap), dtype=np.int64)
+    inverseDigitMap[digitMap] = np.arange(len(digitMap))
+    canonical = np.asarray(board, dtype=np.int64)
+    oriented = np.empty_like(canonical)
+    oriented[np.ix_(rowOrder, columnOrder)] = inverseDigitMap[canonical]
+    return (oriented.T if isTransposed else oriented).tolist()
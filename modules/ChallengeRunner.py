@@ -0,0 +1,86 @@
+import contextlib
+import io
+import queue
+import random
+import time
+from multiprocessing import Pool
+
+from modules.ProgressReporter import QUIET, RESULT, configureProgress, report
+from modules.SolverBackend import selectBackend
+from modules.generateUniqueSolutionG1 import generateUniqueSolutionG1
+from utility.addRandomHints import addRandomHints
+
+# ワーカープロセスごとの設定とソルバー(initializeWorkerで1回だけ作る)
+workerSettings = None
+workerBackend = None
+
+
+def initializeWorker(settings, solverThreads=None):
+    # solverThreads: ソルバーが使うスレッド数(Noneならソルバーの既定．複数プロセスで同時に解く場合は1)
+    global workerSettings, workerBackend
+    workerSettings = settings
+    workerBackend = selectBackend(settings["maxNumber"], settings["solverBackends"])
+    if solverThreads is not None:
+        workerBackend.setThreads(solverThreads)
+    configureProgress(QUIET)  # 並列に動く各チャレンジの途中経過は表示しない
+
+
+def runChallenge(challengeNumber, seed, limitTime):
+    # 1回分のチャレンジ: 解盤面Aからランダムにヒントを追加し，G1で唯一解の問題を作る
+    # 戻り値: (チャレンジ番号, ヒント追加後の盤面, 処理時間, generateUniqueSolutionG1の戻り値)
+    settings = workerSettings
+    random.seed(seed)
+    selectedBoard = addRandomHints(settings["inputBoard"], settings["boardA"], settings["targetHintCount"])
+
+    startTime = time.time()
+    # 並列に動く各チャレンジの途中経過は表示しない
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = generateUniqueSolutionG1(
+            [row[:] for row in selectedBoard], settings["maxSolutions"], limitTime,
+            settings["changeGenerationLimit"], settings["generationLimits"], workerBackend, settings["stableWindow"])
+    return challengeNumber, selectedBoard, time.time() - startTime, result
+
+
+def runChallenges(settings, numberOfWorkers, totalLimitTime):
+    # 独立したチャレンジ(それぞれ別のシードとヒント)をnumberOfWorkers個のプロセスで同時に実行し，
+    # 終わった順に結果を返すジェネレータ．totalLimitTimeを過ぎたら新しいチャレンジは始めない
+    # close()されたら(早期終了など)実行中のワーカーも止める
+    totalStartTime = time.time()
+    challengeCount = 0
+
+    if numberOfWorkers <= 1:
+        # 1プロセスならこのプロセスで順番に実行する
+        initializeWorker(settings)
+        while time.time() - totalStartTime <= totalLimitTime:
+            challengeCount += 1
+            yield runChallenge(challengeCount, random.randrange(2 ** 32),
+                               totalLimitTime - (time.time() - totalStartTime))
+        report("制限時間を超えたため処理を終了します。", RESULT)
+        return
+
+    completed = queue.Queue()  # 終わったチャレンジの結果(または例外)
+    # 各ワーカーのソルバーは1スレッドにする(コア数のワーカーがそれぞれコア数のスレッドを使わない)
+    pool = Pool(numberOfWorkers, initializer=initializeWorker, initargs=(settings, 1))
+    try:
+        runningCount = 0
+        while True:
+            # 空いているワーカーに新しいチャレンジを割り当てる
+            while runningCount < numberOfWorkers and time.time() - totalStartTime <= totalLimitTime:
+                challengeCount += 1
+                pool.apply_async(
+                    runChallenge,
+                    (challengeCount, random.randrange(2 ** 32), totalLimitTime - (time.time() - totalStartTime)),
+                    callback=completed.put, error_callback=completed.put)
+                runningCount += 1
+            if runningCount == 0:
+                report("制限時間を超えたため処理を終了します。", RESULT)
+                return
+
+            result = completed.get()
+            runningCount -= 1
+            if isinstance(result, BaseException):
+                raise result
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,46 @@
+import os
+import pickle
+import zlib
+
+from modules.ProgressReporter import RESULT, report
+
+# 唯一解生成の途中状態をファイルに保存し，中断したところから再開できるようにする
+# 中身はpickleをzlibで圧縮したもの．書き込み途中で止まっても前回の保存が壊れないよう，
+# 一時ファイルに書いてから置き換える
+CHECKPOINT_VERSION = 3  # 3: ランダムにヒントを追加する前の入力盤面(inputBoard)で照合する
+
+
+def saveCheckpoint(path, state):
+    data = zlib.compress(pickle.dumps({"version": CHECKPOINT_VERSION, **state}, pickle.HIGHEST_PROTOCOL))
+    temporaryPath = path + ".tmp"
+    with open(temporaryPath, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporaryPath, path)
+
+
+def loadCheckpoint(path, algorithm, inputBoard):
+    # 同じアルゴリズムで，同じ入力盤面(inputBoard)から始めた保存があればその状態を返す．なければNone
+    # 入力盤面が変わっていれば(INPUT_KEYを変えた場合など)使わない
+    # ランダムに追加したヒントは実行ごとに変わるので照合に使わない(再開時は保存した盤面を使う)
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as file:
+        state = pickle.loads(zlib.decompress(file.read()))
+    if state.get("version") != CHECKPOINT_VERSION:
+        report(f"チェックポイント {path} は古い形式なので使いません。", RESULT)
+        return None
+    if state.get("algorithm") != algorithm:
+        report(f"チェックポイント {path} は別のアルゴリズム({state.get('algorithm')})のものなので使いません。", RESULT)
+        return None
+    if state.get("inputBoard") != inputBoard:
+        report(f"チェックポイント {path} は別の入力盤面から始めたものなので使いません。", RESULT)
+        return None
+    return state
+
+
+def removeCheckpoint(path):
+    if path is not None and os.path.exists(path):
+        os.remove(path)
+
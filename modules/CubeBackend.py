@@ -0,0 +1,146 @@
+import os
+from collections import deque
+from multiprocessing import Pool, current_process
+
+import numpy as np
+
+from modules.SolverBackend import SolverBackend, createBackend
+from modules.BitmaskSolver import BitmaskSolver
+from modules.SolutionSet import asSolutionSet
+
+
+def splitIntoCubes(board, numberOfCubes):
+    # 候補数の少ないマスから順に数字を固定して，盤面をnumberOfCubes個程度の「キューブ」に分ける
+    # 各キューブの解は互いに重ならず，全て合わせると元の盤面の解全体になる
+    # 戻り値: キューブの盤面(固定したマスと伝播で確定したマスを埋めたもの)のリスト．解がなければ空
+    size = len(board)
+    solver = BitmaskSolver(board)
+    if solver.isInfeasible or not solver.propagate(solver.state):
+        return []
+
+    pending = deque([solver.state])  # まだ分割できるキューブ
+    finished = []  # 全てのマスが埋まったキューブ
+    while pending and len(pending) + len(finished) < numberOfCubes:
+        state = pending.popleft()
+        candidates = state[1]
+        emptyCells = [cell for cell, candidateMask in enumerate(candidates) if candidateMask]
+        if not emptyCells:
+            finished.append(state)
+            continue
+
+        # 候補数が最も少ないマスの候補ごとにキューブを作る
+        bestCell = min(emptyCells, key=lambda cell: bin(candidates[cell]).count("1"))
+        candidateMask = candidates[bestCell]
+        while candidateMask:
+            bit = candidateMask & -candidateMask
+            candidateMask ^= bit
+            child = [list(part) for part in state]
+            queue = []
+            solver.place(child, bestCell, bit, queue)
+            if solver.propagate(child, queue):
+                pending.append(child)
+
+    return [[grid[i * size:(i + 1) * size] for i in range(size)] for grid, _ in finished + list(pending)]
+
+
+def selectConsistentWithCube(solutionSet, cubeBoard):
+    # キューブで埋まっているマスが全て一致する解盤面だけを，詰めたままSolutionSetで返す
+    mask = np.ones(len(solutionSet), dtype=bool)
+    for i, row in enumerate(cubeBoard):
+        for j, value in enumerate(row):
+            if value:
+                mask &= solutionSet.cellValues(i, j) == value
+    return solutionSet.select(mask)
+
+
+# ワーカープロセスごとの元のソルバー(initializeCubeWorkerで1回だけ作る)
+cubeWorkerBackend = None
+
+
+def initializeCubeWorker(baseBackend, options):
+    global cubeWorkerBackend
+    cubeWorkerBackend = createBackend(baseBackend, **options)
+    cubeWorkerBackend.setThreads(1)  # ワーカー数だけ同時に解くので，1つのワーカーでは1スレッドにする
+
+
+def enumerateCube(task):
+    # 1つのキューブの解を最大limit個求め，(解の数, size, size) のuint8配列で返す(プロセス間の受け渡しを小さくする)
+    cubeBoard, limit, excludedSolutions = task
+    size = len(cubeBoard)
+    solutions = cubeWorkerBackend.enumerateSolutions(cubeBoard, limit, excludedSolutions)
+    return np.asarray(solutions, dtype=np.uint8).reshape(-1, size, size)
+
+
+class CubeBackend(SolverBackend):
+    # cube-and-conquer: 盤面をキューブに分け，キューブごとの列挙を別プロセスで同時に行う
+    # 1回の列挙の上限(limit)はキューブに等分する(1キューブあたり最低2個)
+    # キューブの列挙が1解で終わるのはそのキューブの解が1つしかない場合だけなので，
+    # 全体で1解しか見つからなければ唯一解であることは変わらない
+    # ワーカーのプロセスは最初の列挙で作り，close()するまで次の列挙(次のヒント追加)でも使い回す
+    name = "cube"
+
+    def __init__(self, baseBackend="bitmask", numberOfWorkers=None, numberOfCubes=None, **options):
+        self.baseBackendName = baseBackend
+        self.options = options
+        self.baseBackend = createBackend(baseBackend, **options)  # このプロセスで使う元のソルバー
+        self.numberOfWorkers = numberOfWorkers or os.cpu_count() or 1
+        # 解の数の偏りをならすため，既定ではプロセス数の2倍のキューブに分ける
+        self.numberOfCubes = numberOfCubes or 2 * self.numberOfWorkers
+        self.pool = None
+
+    def getPool(self):
+        if self.pool is None:
+            self.pool = Pool(self.numberOfWorkers,
+                             initializer=initializeCubeWorker, initargs=(self.baseBackendName, self.options))
+        return self.pool
+
+    def generateSolutions(self, board, limit=None, excludedSolutions=None):
+        if limit is not None and limit <= 0:
+            return
+        cubes = splitIntoCubes(board, self.numberOfCubes)
+        if not cubes:
+            return
+        cubeLimit = None if limit is None else max(-(-limit // len(cubes)), 2)
+        excludedSet = asSolutionSet(excludedSolutions, len(board))
+        tasks = [(cubeBoard, cubeLimit, selectConsistentWithCube(excludedSet, cubeBoard)) for cubeBoard in cubes]
+
+        if self.numberOfWorkers <= 1 or current_process().daemon:
+            # 並列化しない(またはプールのワーカー内で子プロセスを作れない)場合はキューブを順番に列挙する
+            cubeResults = (self.baseBackend.generateSolutions(*task) for task in tasks)
+            isParallel = False
+        else:
+            cubeResults = (solutionArray.tolist()
+                           for solutionArray in self.getPool().imap_unordered(enumerateCube, tasks))
+            isParallel = True
+
+        # 終わったキューブから順に，合計limit個まで返す
+        solutionCount = 0
+        finishedCubes = 0
+        try:
+            for cubeSolutions in cubeResults:
+                finishedCubes += 1
+                for solution in cubeSolutions:
+                    yield solution
+                    solutionCount += 1
+                    if limit is not None and solutionCount >= limit:
+                        return
+        finally:
+            # 上限なしの列挙を途中で打ち切った場合，残りのキューブは終わらないことがあるのでワーカーごと止める
+            # (上限があれば残りのキューブもすぐ終わるので，結果を捨てるだけでワーカーは使い回す)
+            if isParallel and finishedCubes < len(tasks) and cubeLimit is None:
+                self.close()
+
+    def setThreads(self, threads):
+        self.baseBackend.setThreads(threads)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def completeBoard(self, board):
+        return self.baseBackend.completeBoard(board)
+
+    def createUniquenessOracle(self, board, currentSolution):
+        return self.baseBackend.createUniquenessOracle(board, currentSolution)
@@ -0,0 +1,120 @@
+class DancingLinks:
+    # Algorithm X(Dancing Links)による数独の完全被覆問題ソルバー
+    # 各列は「マス」「行×数字」「列×数字」「ブロック×数字」の制約を表し，
+    # 各行は「(行, 列, 数字)」の候補を表す．Gurobiライセンスは不要
+    def __init__(self, board):
+        self.board = board
+        self.size = len(board)
+        self.blockSize = int(self.size ** 0.5)
+        self.isInfeasible = False  # ヒント同士が矛盾している場合True
+
+        # columns: 制約 -> その制約を満たす候補の集合
+        # rows: 候補 -> その候補が満たす制約のリスト
+        self.columns = {}
+        self.rows = {}
+        for i in range(self.size):
+            for j in range(self.size):
+                b = (i // self.blockSize) * self.blockSize + j // self.blockSize
+                for v in range(1, self.size + 1):
+                    self.rows[(i, j, v)] = [
+                        ("cell", i, j), ("row", i, v), ("col", j, v), ("box", b, v)]
+        for candidate, constraints in self.rows.items():
+            for constraint in constraints:
+                self.columns.setdefault(constraint, set()).add(candidate)
+
+        # 初期値（ヒント）の候補を選択済みにする
+        for i in range(self.size):
+            for j in range(self.size):
+                value = board[i][j]
+                if value == 0:
+                    continue
+                candidate = (i, j, value)
+                if any(constraint not in self.columns for constraint in self.rows[candidate]):
+                    self.isInfeasible = True
+                    return
+                self.select(candidate)
+
+    def select(self, candidate):
+        # 候補を選択し，衝突する候補を全て取り除く
+        removed = []
+        for constraint in self.rows[candidate]:
+            for other in self.columns[constraint]:
+                for otherConstraint in self.rows[other]:
+                    if otherConstraint != constraint:
+                        self.columns[otherConstraint].remove(other)
+            removed.append(self.columns.pop(constraint))
+        return removed
+
+    def deselect(self, candidate, removed):
+        # selectの逆操作
+        for constraint in reversed(self.rows[candidate]):
+            self.columns[constraint] = removed.pop()
+            for other in self.columns[constraint]:
+                for otherConstraint in self.rows[other]:
+                    if otherConstraint != constraint:
+                        self.columns[otherConstraint].add(other)
+
+    def chooseColumn(self):
+        # 候補数が最も少ない制約を選ぶ(候補数1以下なら即決定)
+        bestConstraint = None
+        bestCount = self.size + 1
+        for constraint, candidates in self.columns.items():
+            count = len(candidates)
+            if count < bestCount:
+                bestConstraint = constraint
+                bestCount = count
+                if count <= 1:
+                    break
+        return bestConstraint
+
+    def buildSolution(self, selected):
+        solution = [row[:] for row in self.board]
+        for i, j, v in selected:
+            solution[i][j] = v
+        return solution
+
+    def generateSolutions(self, limit=None):
+        # 解盤面を1つずつ返すジェネレータ．limit個返すか全解を列挙したら終了
+        if self.isInfeasible:
+            return
+        if not self.columns:
+            yield self.buildSolution([])
+            return
+
+        solutionCount = 0
+        selected = []  # 現在選択している候補
+        # 各深さの [候補リスト, 現在のインデックス, 選択時に取り除いた集合]
+        stack = [[list(self.columns[self.chooseColumn()]), -1, None]]
+        try:
+            while stack:
+                frame = stack[-1]
+                candidates, index, removed = frame
+                if removed is not None:  # 前回の選択を元に戻す
+                    self.deselect(candidates[index], removed)
+                    selected.pop()
+                    frame[2] = None
+
+                index += 1
+                if index >= len(candidates):
+                    stack.pop()
+                    continue
+                frame[1] = index
+                frame[2] = self.select(candidates[index])
+                selected.append(candidates[index])
+
+                if not self.columns:  # 全ての制約が満たされた
+                    yield self.buildSolution(selected)
+                    solutionCount += 1
+                    if limit is not None and solutionCount >= limit:
+                        return
+                    continue
+
+                constraint = self.chooseColumn()
+                if self.columns[constraint]:
+                    stack.append([list(self.columns[constraint]), -1, None])
+        finally:
+            # 途中で終了・closeされた場合も初期状態に戻す
+            while stack:
+                candidates, index, removed = stack.pop()
+                if removed is not None:
+                    self.deselect(candidates[index], removed)
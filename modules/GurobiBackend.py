@@ -0,0 +1,442 @@
+import os
+import random
+from functools import lru_cache
+
+import gurobipy as gp
+import numpy as np
+import scipy.sparse as sp
+from gurobipy import GRB
+
+from modules.SolverBackend import SolverBackend
+from modules.BitmaskSolver import BitmaskSolver
+from modules.SolutionSet import SolutionSet, asSolutionSet
+from modules.Tracing import isTracing, phase
+
+
+@lru_cache(maxsize=None)
+def sudokuConstraintMatrix(size):
+    # 数独の制約(各マス・各行・各列・各ブロックに1つずつ)の係数行列を疎行列で作る．サイズごとに1回だけ作る
+    # 変数 isValueInCell[i, j, k] は (i * size + j) * size + (k - 1) 番目の列
+    # 行は 各マス(i, j)，各行(i, k)，各列(j, k)，各ブロック(b, k) の順に size * size 個ずつ
+    blockSize = int(size ** 0.5)
+    i, j, k = np.indices((size, size, size)).reshape(3, -1)
+    block = (i // blockSize) * blockSize + j // blockSize
+    rows = np.concatenate([
+        i * size + j,
+        size * size + i * size + k,
+        2 * size * size + j * size + k,
+        3 * size * size + block * size + k,
+    ])
+    columns = np.tile(np.arange(size ** 3), 4)
+    return sp.csr_matrix((np.ones(len(rows)), (rows, columns)), shape=(4 * size * size, size ** 3))
+
+
+@lru_cache(maxsize=None)
+def sudokuVariableKeys(size):
+    # 列の番号順の (行, 列, 数字) のリスト
+    return tuple((i, j, k) for i in range(size) for j in range(size) for k in range(1, size + 1))
+
+
+def addSudokuVariables(model, size, columns, lowerBounds, constraintMatrix):
+    # columns番目の変数をまとめて追加し，constraintMatrix @ x == 1 をまとめて追加する
+    # 戻り値: (行, 列, 数字) -> 変数 の tupledict(除外制約やヒントの固定で個々の変数を使う)
+    variables = model.addMVar(len(columns), vtype=GRB.BINARY, lb=lowerBounds, name="IsValueInCell")
+    model.addMConstr(constraintMatrix, variables, '=', np.ones(constraintMatrix.shape[0]))
+    keys = sudokuVariableKeys(size)
+    return gp.tupledict(zip((keys[column] for column in columns), variables.tolist()))
+
+
+def buildSudokuModel(board, env=None):
+    # 数独の定式化(変数は isValueInCell[行, 列, 数字]．数字は1から)
+    # 制約はサイズごとに作っておいた疎行列で一度に追加する(行列API)
+    size = len(board)
+    model = gp.Model("Sudoku", env=env)
+    model.setParam('OutputFlag', 0)  # ソルバー出力を抑制
+
+    # 1〜4. 各マスに1つ，各行・列・ブロックに1からsizeの数字が1つずつ入る
+    # 5. 初期値(ヒント)は変数の下限を1にして固定する
+    boardArray = np.asarray(board, dtype=np.int64).ravel()
+    lowerBounds = np.zeros(size ** 3)
+    hintCells = np.flatnonzero(boardArray)
+    lowerBounds[hintCells * size + boardArray[hintCells] - 1] = 1
+    isValueInCell = addSudokuVariables(model, size, range(size ** 3), lowerBounds, sudokuConstraintMatrix(size))
+    return model, isValueInCell
+
+
+# ヒントなしの基本モデルのテンプレート．サイズごとに1回だけ作り，メモリとディスクの両方に置く
+# 新しいプロセスではディスクのモデルファイルを読み込むだけで済む(定式化を変えたらVERSIONを上げる)
+MODEL_TEMPLATE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modelTemplates")
+MODEL_TEMPLATE_VERSION = 1
+modelTemplates = {}  # サイズ -> テンプレートのモデル
+modelTemplatePid = None  # テンプレートを作ったプロセス(fork先では作り直す)
+templateEnvironment = None  # テンプレートとそのコピー用の出力なしの環境
+templateEnvironmentParameters = {"OutputFlag": 0}  # templateEnvironmentのパラメータ(setGurobiThreadsで変える)
+
+
+def getTemplateEnvironment():
+    global modelTemplatePid, templateEnvironment
+    if modelTemplatePid != os.getpid():
+        # Gurobiのモデルはプロセス間で共有できないので，fork先では使わない
+        modelTemplates.clear()
+        templateEnvironment = gp.Env(params=templateEnvironmentParameters)
+        modelTemplatePid = os.getpid()
+    return templateEnvironment
+
+
+def setGurobiThreads(threads):
+    # このプロセスで作るモデルのスレッド数(Threads)．並列に動くワーカーでは1にする
+    # (既定ではモデルごとにコア数分のスレッドを使うので，ワーカー数×コア数のスレッドが取り合いになる)
+    global modelTemplatePid
+    if templateEnvironmentParameters.get("Threads") == threads:
+        return
+    templateEnvironmentParameters["Threads"] = threads
+    modelTemplatePid = None  # 次に使うときに環境とテンプレートを作り直す(作成済みのモデルはそのまま)
+
+
+def getModelTemplate(size):
+    environment = getTemplateEnvironment()
+    if size in modelTemplates:
+        return modelTemplates[size]
+
+    path = os.path.join(MODEL_TEMPLATE_DIRECTORY, f"sudoku{size}-v{MODEL_TEMPLATE_VERSION}.mps")
+    template = None
+    if os.path.exists(path):
+        try:
+            template = gp.read(path, environment)
+        except gp.GurobiError:
+            template = None
+        if template is not None and (template.NumVars != size ** 3 or template.NumConstrs != 4 * size * size):
+            template.dispose()  # 壊れたファイルは使わない
+            template = None
+    if template is None:
+        emptyBoard = [[0 for _ in range(size)] for _ in range(size)]
+        template, _ = buildSudokuModel(emptyBoard, environment)
+        template.update()
+        # 一時ファイルに書いてから置き換える(同時に書く他のプロセスと混ざらない)．書けなければメモリだけで使う
+        try:
+            os.makedirs(MODEL_TEMPLATE_DIRECTORY, exist_ok=True)
+            temporaryPath = os.path.join(MODEL_TEMPLATE_DIRECTORY, f"sudoku{size}-v{MODEL_TEMPLATE_VERSION}.{os.getpid()}.mps")
+            template.write(temporaryPath)
+            os.replace(temporaryPath, path)
+        except (OSError, gp.GurobiError):
+            pass
+    modelTemplates[size] = template
+    return template
+
+
+def copySudokuModel(board):
+    # テンプレートのコピーにヒント(変数の下限=1)だけを設定する．戻り値はbuildSudokuModelと同じ
+    size = len(board)
+    model = getModelTemplate(size).copy()
+    isValueInCell = gp.tupledict(zip(sudokuVariableKeys(size), model.getVars()))
+    hintVariables = [isValueInCell[i, j, board[i][j]] for i in range(size) for j in range(size) if board[i][j] != 0]
+    if hintVariables:
+        model.setAttr('LB', hintVariables, [1.0] * len(hintVariables))
+    return model, isValueInCell
+
+
+def buildReducedSudokuModel(board):
+    # ヒントから確定するマスを先に埋め，残った(マス, 数字)の候補だけで定式化する
+    # 戻り値: (モデル, 変数, 確定したマスを埋めた盤面)．矛盾していればNone
+    size = len(board)
+    solver = BitmaskSolver(board)
+    if solver.isInfeasible or not solver.propagate(solver.state):
+        return None
+    grid, candidates = solver.state
+    fixedBoard = [grid[i * size:(i + 1) * size] for i in range(size)]
+
+    model = gp.Model("Sudoku", env=getTemplateEnvironment())  # テンプレートと同じ出力なし・スレッド数の環境
+
+    # 決定変数は候補として残った組だけ(確定したマスは候補なし)
+    isEmpty = np.asarray(grid) == 0
+    candidateBits = (np.asarray(candidates, dtype=np.int64)[:, None] >> np.arange(size)) & 1
+    columns = np.flatnonzero((candidateBits & isEmpty[:, None]).ravel())
+
+    # 全体の係数行列から候補の列だけを取り出す．確定済みの数字を含む行・列・ブロックの制約(変数のない行)は作らない
+    constraintMatrix = sudokuConstraintMatrix(size)[:, columns]
+    constraintMatrix = constraintMatrix[constraintMatrix.getnnz(axis=1) > 0]
+    isValueInCell = addSudokuVariables(model, size, columns, 0.0, constraintMatrix)
+    return model, isValueInCell, fixedBoard
+
+
+class SolutionExtractor:
+    # 変数の値を1回のgetAttrでまとめて読み出し，(マス, 数字)の配列のargmaxで解盤面にする
+    # 変数の並びと作業用の配列はモデルごとに1回だけ作って使い回す
+    def __init__(self, isValueInCell, fixedBoard):
+        size = len(fixedBoard)
+        self.size = size
+        self.variables = gp.MVar.fromlist(list(isValueInCell.values()))  # 値をNumPy配列で一括で読み出せる
+        # 全ての (マス, 数字) に変数があれば読み出した配列をそのまま使う．縮小モデルでは各変数が
+        # (size * size, size) の配列のどこに入るかを覚えておき，そこに書き込む
+        self.isComplete = len(isValueInCell) == size ** 3
+        self.columns = np.array([(i * size + j) * size + k - 1 for i, j, k in isValueInCell.keys()], dtype=np.int64)
+        self.fixedCells = np.asarray(fixedBoard, dtype=np.int64).ravel()
+        self.isFixed = self.fixedCells != 0
+        self.values = np.zeros(size ** 3)
+        self.choices = np.empty(size * size, dtype=np.int64)
+
+    def extract(self, attribute='X'):
+        # 確定済みのマスはfixedBoardの値，それ以外は値が最大(=1)の数字
+        # attribute='Xn'ならSolutionNumber番目の解プールの解を読み出す
+        values = getattr(self.variables, attribute)
+        if self.isComplete:
+            values = values.reshape(self.size * self.size, self.size)
+        else:
+            self.values[self.columns] = values
+            values = self.values.reshape(self.size * self.size, self.size)
+        np.argmax(values, axis=1, out=self.choices)
+        solution = np.where(self.isFixed, self.fixedCells, self.choices + 1)
+        return solution.reshape(self.size, self.size).tolist()
+
+
+# このプロセスでのmodel.optimize()の呼び出し回数(ベンチマークで数える)
+optimizeCallCount = 0
+
+
+def optimizeModel(model):
+    # model.optimize()を実行する．トレース中ならGurobiの実行時間・ノード数・解の数も記録する
+    global optimizeCallCount
+    optimizeCallCount += 1
+    if not isTracing():
+        model.optimize()
+        return
+    with phase("optimize") as span:
+        model.optimize()
+        span.set(status=model.Status, runtime=model.Runtime, nodeCount=model.NodeCount, solutionCount=model.SolCount)
+
+
+def addExclusionConstraint(model, isValueInCell, solution, fixedBoard=None):
+    # 解盤面を除外する制約(全マス一致を禁止する)を追加
+    # fixedBoardで確定しているマスは和から除く．モデル上あり得ない解ならNoneを返す
+    size = len(solution)
+    terms = []
+    for i in range(size):
+        for j in range(size):
+            if fixedBoard is not None and fixedBoard[i][j] != 0:
+                if fixedBoard[i][j] != solution[i][j]:
+                    return None
+                continue
+            key = (i, j, solution[i][j])
+            if key not in isValueInCell:
+                return None
+            terms.append(isValueInCell[key])
+    return model.addConstr(gp.quicksum(terms) <= len(terms) - 1)
+
+
+class GurobiBackend(SolverBackend):
+    # Gurobiで1解ずつ解き，見つかった解を除外制約で禁止しながら列挙する
+    # reduceDomain=Trueならヒントから確定するマスを除いた縮小モデルを使う
+    name = "gurobi"
+
+    def __init__(self, reduceDomain=False):
+        self.reduceDomain = reduceDomain
+
+    def setThreads(self, threads):
+        setGurobiThreads(threads)
+
+    def buildModel(self, board):
+        # 戻り値: (モデル, 変数, 確定したマスを埋めた盤面)．解がないと分かればNone
+        with phase("modelBuild", size=len(board), reduceDomain=self.reduceDomain):
+            if self.reduceDomain:
+                return buildReducedSudokuModel(board)
+            model, isValueInCell = copySudokuModel(board)
+            return model, isValueInCell, board
+
+    def generateSolutions(self, board, limit=None, excludedSolutions=None):
+        builtModel = self.buildModel(board)
+        if builtModel is None:
+            return
+        model, isValueInCell, fixedBoard = builtModel
+
+        # 列挙が終わるか途中でclose()されたらモデルを解放する
+        try:
+            extractor = SolutionExtractor(isValueInCell, fixedBoard)
+            # 除外する解盤面の生成を禁止する(SolutionSetなら1つずつ二次元リストに戻して追加する)
+            for solution in excludedSolutions or []:
+                addExclusionConstraint(model, isValueInCell, solution, fixedBoard)
+
+            solutionCount = 0
+            while limit is None or solutionCount < limit:
+                optimizeModel(model)
+                if model.Status != GRB.OPTIMAL:
+                    return
+                with phase("extract"):
+                    solution = extractor.extract()
+                addExclusionConstraint(model, isValueInCell, solution, fixedBoard)
+                solutionCount += 1
+                yield solution
+        finally:
+            model.dispose()
+
+    def sampleSolutions(self, board):
+        # 同じモデルの目的関数の係数とSeedを毎回ランダムに変えて解き直す
+        builtModel = self.buildModel(board)
+        if builtModel is None:
+            return
+        model, isValueInCell, fixedBoard = builtModel
+        variables = list(isValueInCell.values())
+        extractor = SolutionExtractor(isValueInCell, fixedBoard)
+        model.setParam('SolutionLimit', 1)  # 最適性は不要なので最初に見つかった解で止める
+        try:
+            while True:
+                model.setAttr('Obj', variables, [random.random() for _ in variables])
+                model.setParam('Seed', random.randrange(2 ** 30))
+                model.reset()  # 前回の解が初期解として残るとSolutionLimit=1ではそれがそのまま返るので消す
+                optimizeModel(model)
+                if model.SolCount == 0:
+                    return
+                with phase("extract"):
+                    solution = extractor.extract()
+                yield solution
+        finally:
+            model.dispose()
+
+    def createUniquenessOracle(self, board, currentSolution):
+        return GurobiUniquenessOracle(board, currentSolution)
+
+
+class GurobiUniquenessOracle:
+    # 「currentSolutionと異なる解」を探すモデルを1つだけ作って使い回す
+    # ヒントは変数の下限(LB=1)で追加し，実行不能なら唯一解と判定する(1回のoptimizeで済む)
+    def __init__(self, board, currentSolution):
+        size = len(board)
+        self.currentSolution = currentSolution
+        self.isConsistent = True  # ヒントがcurrentSolutionと一致しているか
+        emptyBoard = [[0 for _ in range(size)] for _ in range(size)]
+        with phase("modelBuild", size=size, reduceDomain=False):
+            self.model, self.isValueInCell = copySudokuModel(emptyBoard)
+        addExclusionConstraint(self.model, self.isValueInCell, currentSolution)
+        for i in range(size):
+            for j in range(size):
+                if board[i][j] != 0:
+                    self.addHint(i, j, board[i][j])
+
+    def addHint(self, i, j, value):
+        if value != self.currentSolution[i][j]:
+            self.isConsistent = False
+        self.isValueInCell[i, j, value].LB = 1
+
+    def isUnique(self):
+        if not self.isConsistent:
+            return False
+        optimizeModel(self.model)
+        return self.model.Status == GRB.INFEASIBLE
+
+
+class PersistentGurobiBackend(GurobiBackend):
+    # ヒント追加のたびにモデルを作り直さず，1つのモデルを使い回す
+    # ヒントは変数の下限(LB=1)の固定で表し，除外制約は必要なものだけを残す
+    name = "gurobiPersistent"
+
+    def __init__(self):
+        super().__init__()
+        self.model = None
+        self.isValueInCell = None
+        self.size = None
+        self.emptyBoard = None
+        self.fixedHints = set()  # LB=1で固定している (行, 列, 数字)
+        self.exclusionConstraints = {}  # 解盤面(SolutionSet.rowKeyで詰めたバイト列) -> 除外制約
+        self.keyPacker = None  # 除外制約のキーを作るための空のSolutionSet
+        self.activeStream = None  # 現在モデルを使っている列挙
+        self.extractor = None
+
+    def prepareModel(self, board):
+        size = len(board)
+        if self.model is None or self.size != size:
+            # 初回(またはサイズ変更時)のみヒントなしの基本モデルを作る
+            self.emptyBoard = [[0 for _ in range(size)] for _ in range(size)]
+            with phase("modelBuild", size=size, reduceDomain=False):
+                self.model, self.isValueInCell = copySudokuModel(self.emptyBoard)
+            self.extractor = SolutionExtractor(self.isValueInCell, self.emptyBoard)
+            self.keyPacker = SolutionSet(size)
+            self.size = size
+            self.fixedHints = set()
+            self.exclusionConstraints = {}
+
+        # 盤面のヒントとの差分だけ変数の下限を更新する
+        hints = {(i, j, board[i][j]) for i in range(size) for j in range(size) if board[i][j] != 0}
+        for hint in self.fixedHints - hints:
+            self.isValueInCell[hint].LB = 0
+        for hint in hints - self.fixedHints:
+            self.isValueInCell[hint].LB = 1
+        self.fixedHints = hints
+
+    def updateExclusionConstraints(self, excludedSolutions):
+        # 今回除外する解の制約は残し，それ以外(前回の列挙で追加したもの)は取り除く
+        # 解盤面は詰めたバイト列で比べ，新しく制約を追加する盤面だけを1つずつ戻す
+        excludedSet = asSolutionSet(excludedSolutions, self.size)
+        excludedKeys = excludedSet.rowKeys()
+        for key in list(self.exclusionConstraints):
+            if key not in excludedKeys:
+                self.model.remove(self.exclusionConstraints.pop(key))
+        for key in excludedKeys:
+            if key not in self.exclusionConstraints:
+                self.exclusionConstraints[key] = addExclusionConstraint(
+                    self.model, self.isValueInCell, excludedSet.solutionFromKey(key))
+
+    def generateSolutions(self, board, limit=None, excludedSolutions=None):
+        self.prepareModel(board)
+        self.updateExclusionConstraints(excludedSolutions)
+        stream = object()
+        self.activeStream = stream
+
+        # モデルは次の列挙で使い回すので解放しない
+        try:
+            solutionCount = 0
+            while limit is None or solutionCount < limit:
+                if self.activeStream is not stream:
+                    # 別の列挙がモデルを更新した．黙って終えると解が尽きたように見える(唯一解と誤判定する)ので例外にする
+                    raise RuntimeError("gurobiPersistent: 同じモデルで別の列挙が始まったため，この列挙は続けられません")
+                optimizeModel(self.model)
+                if self.model.Status != GRB.OPTIMAL:
+                    return
+                with phase("extract"):
+                    solution = self.extractor.extract()
+                # 除外する解盤面と同じ詰め方のキーにする(次の列挙で除外するならそのまま残る)
+                self.exclusionConstraints[self.keyPacker.rowKey(solution)] = addExclusionConstraint(
+                    self.model, self.isValueInCell, solution)
+                solutionCount += 1
+                yield solution
+        finally:
+            if self.activeStream is stream:
+                self.activeStream = None
+
+
+class GurobiPoolBackend(GurobiBackend):
+    # Gurobiの解プール(PoolSearchMode=2)で最大limit個の解を1回のoptimizeでまとめて求める
+    name = "gurobiPool"
+
+    def generateSolutions(self, board, limit=None, excludedSolutions=None):
+        if limit is None:
+            # 上限がない場合は解プールの大きさを決められないので逐次列挙する
+            yield from super().generateSolutions(board, limit, excludedSolutions)
+            return
+        if limit <= 0:
+            return
+
+        builtModel = self.buildModel(board)
+        if builtModel is None:
+            return
+        model, isValueInCell, fixedBoard = builtModel
+
+        # 列挙が終わるか途中でclose()されたらモデルを解放する
+        try:
+            for solution in excludedSolutions or []:
+                addExclusionConstraint(model, isValueInCell, solution, fixedBoard)
+
+            # 目的関数は定数なので，見つかった解は全て最適解としてプールに入る
+            model.setParam('PoolSearchMode', 2)
+            model.setParam('PoolSolutions', limit)
+            optimizeModel(model)
+            if model.Status != GRB.OPTIMAL:
+                return
+
+            # プール内の解を変数ごとではなく一括で読み出す
+            extractor = SolutionExtractor(isValueInCell, fixedBoard)
+            for solutionNumber in range(model.SolCount):
+                with phase("extract"):
+                    model.setParam('SolutionNumber', solutionNumber)
+                    solution = extractor.extract('Xn')
+                yield solution
+        finally:
+            model.dispose()
@@ -0,0 +1,78 @@
+from modules.SolverBackend import SolverBackend
+from modules.DancingLinks import DancingLinks
+from modules.BitmaskSolver import BitmaskSolver
+from modules.SolutionSet import asSolutionSet
+
+
+def skipExcluded(solutionStream, limit, excludedSolutions, size):
+    # 除外する解盤面を読み飛ばしながら最大limit個返す
+    # 除外する解盤面は詰めたバイト列のまま比べる(二次元リストに戻さない)
+    excludedSet = asSolutionSet(excludedSolutions, size)
+    excludedKeys = excludedSet.rowKeys()
+    solutionCount = 0
+    if limit is not None and limit <= 0:
+        return
+    for solution in solutionStream:
+        if excludedKeys and excludedSet.rowKey(solution) in excludedKeys:
+            continue
+        yield solution
+        solutionCount += 1
+        if limit is not None and solutionCount >= limit:
+            return
+
+
+class DancingLinksBackend(SolverBackend):
+    # Dancing Links(Algorithm X)による列挙．Gurobiライセンス不要
+    name = "dancingLinks"
+
+    def generateSolutions(self, board, limit=None, excludedSolutions=None):
+        return skipExcluded(DancingLinks(board).generateSolutions(), limit, excludedSolutions, len(board))
+
+
+class BitmaskBackend(SolverBackend):
+    # ビット集合の制約伝播+バックトラックによる列挙．Gurobiライセンス不要
+    name = "bitmask"
+
+    def __init__(self, randomize=False, rng=None):
+        self.randomize = randomize  # Trueなら数字を試す順番をランダムにする
+        self.rng = rng
+
+    def generateSolutions(self, board, limit=None, excludedSolutions=None):
+        solver = BitmaskSolver(board, self.rng)
+        return skipExcluded(solver.generateSolutions(randomize=self.randomize), limit, excludedSolutions, len(board))
+
+    def sampleSolutions(self, board):
+        # 毎回根から数字の順番をランダムにして解き直す(同じ探索木の近くの解ばかりにならない)
+        solver = BitmaskSolver(board, self.rng)
+        if solver.isInfeasible or not solver.propagate(solver.state):
+            return
+        while True:
+            solution = solver.solve(randomize=True)
+            if solution is None:
+                return
+            yield solution
+
+    def completeBoard(self, board):
+        return BitmaskSolver(board, self.rng).solve(randomize=True)
+
+    def createUniquenessOracle(self, board, currentSolution):
+        return BitmaskUniquenessOracle(board, currentSolution)
+
+
+class BitmaskUniquenessOracle:
+    # ビット集合ソルバーの状態を保持し，ヒントの追加はその場で候補を更新するだけにする
+    def __init__(self, board, currentSolution):
+        self.solver = BitmaskSolver(board)
+        self.currentSolution = currentSolution
+
+    def addHint(self, i, j, value):
+        cell = i * self.solver.size + j
+        if not self.solver.isInfeasible and self.solver.state[1][cell] & (1 << (value - 1)):
+            self.solver.place(self.solver.state, cell, 1 << (value - 1))
+        else:
+            self.solver.isInfeasible = True
+
+    def isUnique(self):
+        # 2つ目の解が見つかった時点で打ち切る
+        foundSolutions = list(self.solver.generateSolutions(2))
+        return len(foundSolutions) == 1 and foundSolutions[0] == self.currentSolution
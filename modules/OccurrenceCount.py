@@ -0,0 +1,97 @@
+import random
+
+import numpy as np
+
+from modules.SolutionSet import SolutionSet
+
+
+# 投票配列(occurrenceCount)は (行, 列, 数字-1) の形の整数配列
+# occurrenceCount[i, j, k] はマス(i, j)が数字k+1である解盤面の数
+
+def solutionsToArray(solutions, size):
+    # 解盤面のリストを (解の数, size, size) の uint8 配列にする
+    return np.asarray(solutions, dtype=np.uint8).reshape(-1, size, size)
+
+
+def calculateOccurrenceCount(solutions, size):
+    # 全ての解盤面の (マス, 数字) を1回のbincountで数える
+    solutionArray = solutionsToArray(solutions, size)
+    cellOffsets = np.arange(size * size, dtype=np.int64) * size
+    indices = solutionArray.reshape(len(solutionArray), -1).astype(np.int64) - 1 + cellOffsets
+    return np.bincount(indices.ravel(), minlength=size ** 3).reshape(size, size, size)
+
+
+def addSolutionToOccurrenceCount(occurrenceCount, solution):
+    # 解盤面1つ分を投票配列に加える
+    size = len(solution)
+    rows, cols = np.indices((size, size))
+    occurrenceCount[rows, cols, np.asarray(solution, dtype=np.int64) - 1] += 1
+
+
+def findMinOccurrence(occurrenceCount, board, randomTie=False):
+    # 空きマスの中で出現回数が最小(1以上)の (マス, 数字) を探す
+    # 戻り値: (最小の出現回数, (行, 列), 数字)．見つからなければ (None, None, None)
+    # 同数の場合は行・列・数字の順で最初のもの．randomTie=Trueならランダムに選ぶ
+    isEmpty = np.asarray(board) == 0
+    isCandidate = isEmpty[:, :, None] & (occurrenceCount > 0)
+    if not isCandidate.any():
+        return None, None, None
+    maskedCount = np.where(isCandidate, occurrenceCount, np.iinfo(np.int64).max)
+    if randomTie:
+        minCount = maskedCount.min()
+        flatIndex = random.choice(np.flatnonzero(maskedCount == minCount).tolist())
+    else:
+        flatIndex = int(maskedCount.argmin())
+    i, j, k = np.unravel_index(flatIndex, occurrenceCount.shape)
+    return int(occurrenceCount[i, j, k]), (int(i), int(j)), int(k) + 1
+
+
+def findFirstOccurrence(occurrenceCount, count):
+    # 出現回数がちょうどcountの (マス, 数字) を行・列・数字の順で最初の1つ探す
+    # 戻り値: ((行, 列), 数字)．見つからなければ (None, None)
+    flatIndices = np.flatnonzero(occurrenceCount == count)
+    if len(flatIndices) == 0:
+        return None, None
+    i, j, k = np.unravel_index(int(flatIndices[0]), occurrenceCount.shape)
+    return (int(i), int(j)), int(k) + 1
+
+
+class OccurrenceTally:
+    # 解盤面の集合(SolutionSet)とその投票配列を一緒に持ち，解の追加・絞り込みのたびに差分だけ更新する
+    def __init__(self, size, solutions=()):
+        self.size = size
+        self.solutions = SolutionSet(size)
+        self.occurrenceCount = np.zeros((size, size, size), dtype=np.int64)
+        self.addSolutions(solutions)
+
+    def __len__(self):
+        return len(self.solutions)
+
+    def addSolution(self, solution):
+        self.solutions.append(solution)
+        addSolutionToOccurrenceCount(self.occurrenceCount, solution)
+
+    def addSolutions(self, solutions):
+        newSolutions = SolutionSet(self.size, solutions)
+        if len(newSolutions):
+            self.solutions.extend(newSolutions)
+            self.occurrenceCount += calculateOccurrenceCount(newSolutions.array(), self.size)
+
+    def filterByHint(self, i, j, value):
+        # マス(i, j)が数字valueの解盤面だけを残す．取り除いた解の分だけ投票配列から引く
+        # (残る解の方が少なければ残る解から数え直す)
+        isKept = self.solutions.cellValues(i, j) == value
+        keptSolutions = self.solutions.select(isKept)
+        removedCount = len(self.solutions) - len(keptSolutions)
+        if removedCount <= len(keptSolutions):
+            if removedCount:
+                removedSolutions = self.solutions.select(~isKept)
+                self.occurrenceCount -= calculateOccurrenceCount(removedSolutions.array(), self.size)
+        else:
+            self.occurrenceCount = calculateOccurrenceCount(keptSolutions.array(), self.size)
+        self.solutions = keptSolutions
+        return keptSolutions
+
+    def clear(self):
+        self.solutions.clear()
+        self.occurrenceCount[:] = 0
@@ -0,0 +1,66 @@
+import time
+
+from utility.printBoard import printBoard
+
+# 表示の詳しさ(小さいほど表示が少ない)
+QUIET = 0  # 何も表示しない(バッチ実行・並列実行のワーカーなど)
+RESULT = 1  # 結果とエラーだけ
+PROGRESS = 2  # ヒントの追加など各ステップの経過(既定)
+VERBOSE = 3  # 途中の盤面もすべて表示
+
+
+class ProgressReporter:
+    # 全モジュールで共有する進捗表示
+    # 解ごとのように回数の多い表示はreportCountで interval 秒に1回までに間引く
+    def __init__(self, level=PROGRESS, interval=1.0):
+        self.level = level
+        self.interval = interval
+        self.lastReportTimes = {}  # ラベル -> 最後に表示した時刻
+
+    def isEnabled(self, level):
+        return level <= self.level
+
+    def report(self, message, level=PROGRESS):
+        if level <= self.level:
+            print(message)
+
+    def reportCount(self, label, count, level=PROGRESS):
+        # 「ラベル 数」の形の表示．前回の表示からinterval秒経っていなければ表示しない(文字列も作らない)
+        if level > self.level:
+            return
+        now = time.time()
+        if now - self.lastReportTimes.get(label, 0.0) >= self.interval:
+            self.lastReportTimes[label] = now
+            print(f"{label} {count}")
+
+    def reportBoard(self, board, title=None, level=VERBOSE):
+        if level <= self.level:
+            if title is not None:
+                print(title)
+            printBoard(board)
+
+
+reporter = ProgressReporter()
+
+
+def configureProgress(level=PROGRESS, interval=1.0):
+    # 表示の詳しさと，間引く間隔(秒)を設定する．0なら間引かない
+    reporter.level = level
+    reporter.interval = interval
+    reporter.lastReportTimes.clear()
+
+
+def isProgressEnabled(level):
+    return reporter.isEnabled(level)
+
+
+def report(message, level=PROGRESS):
+    reporter.report(message, level)
+
+
+def reportCount(label, count, level=PROGRESS):
+    reporter.reportCount(label, count, level)
+
+
+def reportBoard(board, title=None, level=VERBOSE):
+    reporter.reportBoard(board, title, level)
@@ -0,0 +1,62 @@
+from modules.SolverBackend import SolverBackend, createBackend
+from modules.SolutionSet import asSolutionSet
+
+
+class SamplingBackend(SolverBackend):
+    # 除外制約で順番に列挙する代わりに，ランダムに解き直して互いに離れた解盤面を集める
+    # (順番に列挙すると探索木の近くの解に偏り，出現回数の推定が偏る)
+    # 重複を除いてlimit個集める．重複がmaxStall回続いたら解が少ないとみなし，
+    # 残りは元のソルバーで厳密に列挙する(解が1つしかないことの判定は厳密なまま)
+    name = "sampling"
+
+    def __init__(self, baseBackend="bitmask", maxStall=20, **options):
+        self.baseBackend = createBackend(baseBackend, **options)
+        self.maxStall = maxStall
+
+    def generateSolutions(self, board, limit=None, excludedSolutions=None):
+        if limit is None:
+            # 全解が必要なら厳密な列挙と同じ
+            yield from self.baseBackend.generateSolutions(board, limit, excludedSolutions)
+            return
+        if limit <= 0:
+            return
+
+        # 除外する解盤面と見つけた解盤面を詰めたまま持つ(厳密な列挙にもそのまま渡す)
+        foundSolutions = asSolutionSet(excludedSolutions, len(board)).copy()
+        foundKeys = foundSolutions.rowKeys()
+        solutionCount = 0
+        stallCount = 0  # 連続して重複した回数
+        sampleStream = self.baseBackend.sampleSolutions(board)
+        try:
+            for solution in sampleStream:
+                key = foundSolutions.rowKey(solution)
+                if key in foundKeys:
+                    stallCount += 1
+                    if stallCount >= self.maxStall:
+                        break
+                    continue
+                stallCount = 0
+                foundKeys.add(key)
+                foundSolutions.append(solution)
+                solutionCount += 1
+                yield solution
+                if solutionCount >= limit:
+                    return
+        finally:
+            sampleStream.close()
+
+        # 取りこぼしがないように，まだ見つけていない解を厳密に列挙する
+        yield from self.baseBackend.generateSolutions(
+            board, limit - solutionCount, excludedSolutions=foundSolutions)
+
+    def completeBoard(self, board):
+        return self.baseBackend.completeBoard(board)
+
+    def createUniquenessOracle(self, board, currentSolution):
+        return self.baseBackend.createUniquenessOracle(board, currentSolution)
+
+    def setThreads(self, threads):
+        self.baseBackend.setThreads(threads)
+
+    def close(self):
+        self.baseBackend.close()
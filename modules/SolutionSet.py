@@ -0,0 +1,130 @@
+import numpy as np
+
+
+class SolutionSet:
+    # 解盤面の集合を連続したバイト列(1解 = 1行)で持つ
+    # 16×16以上は1マス1バイト，9×9は1マス4ビット(1バイトに2マス)に詰める
+    # 二次元リストで持つ場合に比べて，1マスあたり8バイトのポインタと行ごとのリストが不要になる
+    __slots__ = ("size", "isNibblePacked", "rowBytes", "buffer", "count")
+
+    def __init__(self, size, solutions=()):
+        self.size = size
+        self.isNibblePacked = size < 16  # 数字が1〜15なら4ビットに収まる
+        cellCount = size * size
+        self.rowBytes = (cellCount + 1) // 2 if self.isNibblePacked else cellCount
+        self.buffer = np.empty((16, self.rowBytes), dtype=np.uint8)
+        self.count = 0
+        self.extend(solutions)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        # 1つの解盤面を二次元リストで返す(表示や返却値用)
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return self.unpack(self.buffer[index:index + 1])[0].tolist()
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def reserve(self, capacity):
+        # 容量が足りなければ2倍ずつ広げる(appendは償却O(1))
+        if capacity > len(self.buffer):
+            newCapacity = max(capacity, 2 * len(self.buffer))
+            newBuffer = np.empty((newCapacity, self.rowBytes), dtype=np.uint8)
+            newBuffer[:self.count] = self.buffer[:self.count]
+            self.buffer = newBuffer
+
+    def pack(self, solutionArray):
+        # (解の数, size, size) の配列を1解1行のバイト列にする
+        cells = solutionArray.reshape(len(solutionArray), -1)
+        if not self.isNibblePacked:
+            return cells
+        if cells.shape[1] % 2:
+            cells = np.pad(cells, ((0, 0), (0, 1)))
+        return cells[:, 0::2] | (cells[:, 1::2] << 4)
+
+    def unpack(self, rows):
+        # 1解1行のバイト列を (解の数, size, size) の配列に戻す
+        if not self.isNibblePacked:
+            return rows.reshape(len(rows), self.size, self.size)
+        cells = np.empty((len(rows), 2 * self.rowBytes), dtype=np.uint8)
+        cells[:, 0::2] = rows & 0x0F
+        cells[:, 1::2] = rows >> 4
+        return cells[:, :self.size * self.size].reshape(len(rows), self.size, self.size)
+
+    def append(self, solution):
+        self.reserve(self.count + 1)
+        self.buffer[self.count] = self.pack(np.asarray(solution, dtype=np.uint8)[None])[0]
+        self.count += 1
+
+    def extend(self, solutions):
+        if isinstance(solutions, SolutionSet):
+            solutionArray = solutions.array()
+        else:
+            solutionArray = np.asarray(list(solutions), dtype=np.uint8).reshape(-1, self.size, self.size)
+        if len(solutionArray) == 0:
+            return
+        self.reserve(self.count + len(solutionArray))
+        self.buffer[self.count:self.count + len(solutionArray)] = self.pack(solutionArray)
+        self.count += len(solutionArray)
+
+    def clear(self):
+        self.count = 0
+
+    def copy(self):
+        # 今の解盤面を詰めたまま写したSolutionSet(後でappendしても影響しない)
+        return self.select(slice(None))
+
+    def rowKey(self, solution):
+        # 1つの解盤面(二次元リスト)を詰めたバイト列にする．rowKeys()の要素と比べられる
+        return self.pack(np.asarray(solution, dtype=np.uint8)[None])[0].tobytes()
+
+    def rowKeys(self):
+        # 全解盤面の詰めたバイト列の集合(除外する解盤面の判定用)
+        return {row.tobytes() for row in self.buffer[:self.count]}
+
+    def solutionFromKey(self, key):
+        # rowKeyで詰めたバイト列を1つの解盤面(二次元リスト)に戻す
+        return self.unpack(np.frombuffer(key, dtype=np.uint8)[None])[0].tolist()
+
+    def array(self):
+        # 全解盤面を (解の数, size, size) の配列で返す
+        # 1マス1バイトの場合はコピーせずバッファをそのまま見る(ビュー)
+        return self.unpack(self.buffer[:self.count])
+
+    def cellValues(self, i, j):
+        # 各解盤面のマス(i, j)の数字を並べた配列(詰めたまま取り出す)
+        cell = i * self.size + j
+        if not self.isNibblePacked:
+            return self.buffer[:self.count, cell]
+        column = self.buffer[:self.count, cell // 2]
+        return column >> 4 if cell % 2 else column & 0x0F
+
+    def select(self, mask):
+        # maskがTrueの解盤面だけを集めた新しいSolutionSetを返す
+        selected = SolutionSet(self.size)
+        rows = self.buffer[:self.count][mask]
+        selected.reserve(len(rows))
+        selected.buffer[:len(rows)] = rows
+        selected.count = len(rows)
+        return selected
+
+    def filterByCell(self, i, j, value):
+        # マス(i, j)が数字valueの解盤面だけを残したSolutionSetを返す
+        return self.select(self.cellValues(i, j) == value)
+
+    def nbytes(self):
+        # 解盤面の格納に使っているバイト数
+        return self.count * self.rowBytes
+
+
+def asSolutionSet(solutions, size):
+    # 除外する解盤面などをSolutionSetで受け取る(二次元リストのリストやNoneなら詰め直す)
+    if isinstance(solutions, SolutionSet):
+        return solutions
+    return SolutionSet(size, solutions or ())
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import sqlite3
+import time
+import zlib
+
+import numpy as np
+
+from modules.Canonicalization import applyTransform, canonicalizeBoard, invertTransform
+from modules.SolutionSet import asSolutionSet
+from modules.SolverBackend import SolverBackend, createBackend
+
+# 既定のキャッシュファイル．実行したディレクトリによらずリポジトリ直下に置く
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "solveCache.sqlite3")
+
+
+def boardKey(board):
+    # 盤面(0は空きマス)のハッシュ
+    boardArray = np.asarray(board, dtype=np.uint8)
+    return hashlib.sha256(bytes([len(board)]) + boardArray.tobytes()).hexdigest()
+
+
+def isValidSolution(solutionArray, board):
+    # 各解盤面がboardのヒントと一致し，行・列・ブロックに1〜sizeが1つずつ入っているか(まとめて確認)
+    size = len(board)
+    blockSize = int(size ** 0.5)
+    boardArray = np.asarray(board, dtype=np.uint8)
+    if solutionArray.shape[1:] != (size, size):
+        return False
+    isHint = boardArray != 0
+    if not (solutionArray[:, isHint] == boardArray[isHint]).all():
+        return False
+    if solutionArray.min(initial=1) < 1 or solutionArray.max(initial=1) > size:
+        return False
+    # 値ごとのビットの和が全ビットになれば1〜sizeが揃っている
+    bits = np.left_shift(np.int64(1), solutionArray.astype(np.int64) - 1)
+    fullMask = (1 << size) - 1
+    blocks = bits.reshape(-1, blockSize, blockSize, blockSize, blockSize).transpose(0, 1, 3, 2, 4)
+    return ((np.bitwise_or.reduce(bits, axis=2) == fullMask).all()
+            and (np.bitwise_or.reduce(bits, axis=1) == fullMask).all()
+            and (np.bitwise_or.reduce(blocks.reshape(-1, size, size), axis=2) == fullMask).all()
+            and len({solution.tobytes() for solution in solutionArray}) == len(solutionArray))
+
+
+class SolveCache:
+    # 盤面ごとの列挙結果(先頭の解盤面と，それで全てかどうか)を保存するSQLiteのキャッシュ
+    # maxEntriesを超えたら最後に使われたのが古いものから消す(LRU)
+    def __init__(self, path, maxEntries=10000):
+        self.path = path
+        self.maxEntries = maxEntries
+        self.connection = None
+        self.connectionPid = None
+
+    def connect(self):
+        # プロセスごとに接続する(複数プロセスから同じファイルを使ってよい)
+        if self.connection is None or self.connectionPid != os.getpid():
+            self.connection = sqlite3.connect(self.path, timeout=60)
+            self.connectionPid = os.getpid()
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS solutions ("
+                "key TEXT PRIMARY KEY, size INTEGER, solutionCount INTEGER, isComplete INTEGER, "
+                "data BLOB, lastUsed REAL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS solutionsLastUsed ON solutions (lastUsed)")
+            self.connection.commit()
+        return self.connection
+
+    def __getstate__(self):
+        # 接続はプロセス間で受け渡さない
+        return {"path": self.path, "maxEntries": self.maxEntries, "connection": None, "connectionPid": None}
+
+    def getSolutions(self, board):
+        # 戻り値: (解盤面の配列, 全ての解か)．キャッシュにない，または確認に失敗したらNone
+        key = boardKey(board)
+        connection = self.connect()
+        row = connection.execute(
+            "SELECT size, solutionCount, isComplete, data FROM solutions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        size, solutionCount, isComplete, data = row
+        solutionArray = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(solutionCount, size, size)
+        if size != len(board) or not isValidSolution(solutionArray, board):
+            # 盤面に合わない(ハッシュの衝突や壊れたデータ)ものは使わずに消す
+            connection.execute("DELETE FROM solutions WHERE key = ?", (key,))
+            connection.commit()
+            return None
+        connection.execute("UPDATE solutions SET lastUsed = ? WHERE key = ?", (time.time(), key))
+        connection.commit()
+        return solutionArray, bool(isComplete)
+
+    def putSolutions(self, board, solutions, isComplete):
+        size = len(board)
+        solutionArray = np.asarray(solutions, dtype=np.uint8).reshape(-1, size, size)
+        connection = self.connect()
+        connection.execute(
+            "INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?, ?)",
+            (boardKey(board), size, len(solutionArray), int(isComplete),
+             zlib.compress(solutionArray.tobytes()), time.time()))
+        # 上限を超えた分は最後に使われたのが古いものから消す
+        connection.execute(
+            "DELETE FROM solutions WHERE key IN (SELECT key FROM solutions ORDER BY lastUsed DESC LIMIT -1 OFFSET ?)",
+            (self.maxEntries,))
+        connection.commit()
+
+
+class CachedBackend(SolverBackend):
+    # 元のソルバーの列挙結果を盤面ごとにキャッシュする
+    # 同じ盤面を同じかそれ以下の上限で列挙する場合(同じ入力での再実行など)はソルバーを使わない
+    # canonical=Trueなら盤面を正規形(Canonicalization)にしてから引くので，
+    # 転置・行列の並べ替え・数字の付け替えで同じになる盤面同士でもキャッシュを共有する
+    name = "cached"
+
+    def __init__(self, baseBackend="gurobi", cachePath=DEFAULT_CACHE_PATH, maxEntries=10000,
+                 canonical=True, maxCandidates=1024, **options):
+        self.baseBackend = createBackend(baseBackend, **options)
+        self.cache = SolveCache(cachePath, maxEntries)
+        self.canonical = canonical
+        self.maxCandidates = maxCandidates
+
+    def toCacheBoard(self, board):
+        # 戻り値: (キャッシュに使う盤面, 変換)．正規形を使わない場合の変換はNone
+        if not self.canonical:
+            return board, None
+        return canonicalizeBoard(board, self.maxCandidates)
+
+    def generateSolutions(self, board, limit=None, excludedSolutions=None):
+        if limit is not None and limit <= 0:
+            return
+        cacheBoard, transform = self.toCacheBoard(board)
+        cached = self.cache.getSolutions(cacheBoard)
+        if cached is not None:
+            solutionArray, isComplete = cached
+            # 全ての解が保存されているか，除外なしで先頭のlimit個が保存されていれば使える
+            if not isComplete and (excludedSolutions or limit is None or len(solutionArray) < limit):
+                cached = None
+        if cached is not None:
+            excludedSet = asSolutionSet(excludedSolutions, len(board))
+            excludedKeys = excludedSet.rowKeys()
+            solutionCount = 0
+            for solution in solutionArray.tolist():
+                if transform is not None:
+                    solution = invertTransform(solution, transform)
+                if excludedKeys and excludedSet.rowKey(solution) in excludedKeys:
+                    continue
+                yield solution
+                solutionCount += 1
+                if limit is not None and solutionCount >= limit:
+                    return
+            return
+
+        # 元のソルバーで列挙し，最後まで取り出された場合だけ保存する(途中でclose()されたら保存しない)
+        solutions = []
+        for solution in self.baseBackend.generateSolutions(board, limit, excludedSolutions):
+            solutions.append(solution)
+            yield solution
+        if not excludedSolutions:
+            if transform is not None:
+                solutions = [applyTransform(solution, transform) for solution in solutions]
+            self.cache.putSolutions(cacheBoard, solutions, isComplete=limit is None or len(solutions) < limit)
+
+    def completeBoard(self, board):
+        cacheBoard, transform = self.toCacheBoard(board)
+        cached = self.cache.getSolutions(cacheBoard)
+        if cached is not None and len(cached[0]) > 0:
+            solution = cached[0][0].tolist()
+            return solution if transform is None else invertTransform(solution, transform)
+        if cached is not None and cached[1]:
+            return None  # 解がないことが分かっている
+        return self.baseBackend.completeBoard(board)
+
+    def createUniquenessOracle(self, board, currentSolution):
+        return self.baseBackend.createUniquenessOracle(board, currentSolution)
+
+    def setThreads(self, threads):
+        self.baseBackend.setThreads(threads)
+
+    def close(self):
+        self.baseBackend.close()
@@ -0,0 +1,124 @@
+import importlib
+
+
+class SolverBackend:
+    # 数独ソルバーの共通インターフェース
+    # 盤面は 0 を空きマスとする 1-indexed の数値の二次元リストで受け渡す
+    name = None
+
+    def generateSolutions(self, board, limit=None, excludedSolutions=None):
+        # 解盤面を1つずつ返すジェネレータ．excludedSolutions(SolutionSetまたは解盤面のリスト)に含まれる解は返さない
+        raise NotImplementedError
+
+    def sampleSolutions(self, board):
+        # 解盤面をランダムに1つずつ返し続けるジェネレータ(同じ解が何度も出てよい)
+        # 解がなければ何も返さない．ランダムに解けないソルバーでは使えない
+        raise NotImplementedError
+
+    def completeBoard(self, board):
+        # 盤面を埋めた解盤面を1つ返す．解がなければNone
+        return next(self.generateSolutions(board, 1), None)
+
+    def enumerateSolutions(self, board, limit, excludedSolutions=None):
+        # 解盤面を最大limit個リストで返す
+        return list(self.generateSolutions(board, limit, excludedSolutions))
+
+    def countSolutions(self, board, cap):
+        # 解の数をcap個まで数える
+        return sum(1 for _ in self.generateSolutions(board, cap))
+
+    def isUnique(self, board):
+        # 唯一解かどうか(2つ目の解が見つかった時点で打ち切る)
+        return self.countSolutions(board, 2) == 1
+
+    def createUniquenessOracle(self, board, currentSolution):
+        # 「盤面の解がcurrentSolutionただ1つか」を繰り返し判定するオブジェクトを作る
+        return UniquenessOracle(self, board, currentSolution)
+
+    def setThreads(self, threads):
+        # ソルバーが内部で使うスレッド数を設定する(並列に動くワーカーでは1にする)．スレッドを使わないソルバーでは何もしない
+        pass
+
+    def close(self):
+        # ソルバーが持っているワーカープロセスなどを片付ける．何も持たないソルバーでは何もしない
+        pass
+
+
+class UniquenessOracle:
+    # 汎用の唯一解判定．ヒントを追加した盤面を保持し，判定のたびに最大2解まで列挙する
+    def __init__(self, backend, board, currentSolution):
+        self.backend = backend
+        self.board = [row[:] for row in board]
+        self.currentSolution = currentSolution
+
+    def addHint(self, i, j, value):
+        self.board[i][j] = value
+
+    def isUnique(self):
+        foundSolutions = self.backend.enumerateSolutions(self.board, 2)
+        return len(foundSolutions) == 1 and foundSolutions[0] == self.currentSolution
+
+
+# 名前 -> ("モジュール名.クラス名", 既定のオプション)
+# 使うときに初めてimportするので，Gurobiを使わない場合はgurobipyが不要
+BACKEND_CLASSES = {
+    "gurobi": ("modules.GurobiBackend.GurobiBackend", {}),
+    "gurobiReduced": ("modules.GurobiBackend.GurobiBackend", {"reduceDomain": True}),
+    "gurobiPersistent": ("modules.GurobiBackend.PersistentGurobiBackend", {}),
+    "gurobiPool": ("modules.GurobiBackend.GurobiPoolBackend", {}),
+    "gurobiPoolReduced": ("modules.GurobiBackend.GurobiPoolBackend", {"reduceDomain": True}),
+    "dancingLinks": ("modules.NativeBackends.DancingLinksBackend", {}),
+    "bitmask": ("modules.NativeBackends.BitmaskBackend", {}),
+    "bitmaskSampling": ("modules.SamplingBackend.SamplingBackend", {"baseBackend": "bitmask"}),
+    "gurobiSampling": ("modules.SamplingBackend.SamplingBackend", {"baseBackend": "gurobi"}),
+    "gurobiCube": ("modules.CubeBackend.CubeBackend", {"baseBackend": "gurobi"}),
+    "bitmaskCube": ("modules.CubeBackend.CubeBackend", {"baseBackend": "bitmask"}),
+    "gurobiCached": ("modules.SolveCache.CachedBackend", {"baseBackend": "gurobi"}),
+    "bitmaskCached": ("modules.SolveCache.CachedBackend", {"baseBackend": "bitmask"}),
+}
+
+
+def registerBackend(name, classPath, **defaultOptions):
+    BACKEND_CLASSES[name] = (classPath, defaultOptions)
+
+
+def createBackend(name, **options):
+    if name not in BACKEND_CLASSES:
+        raise ValueError(f"未登録のソルバーです: {name} (登録済み: {', '.join(BACKEND_CLASSES)})")
+    classPath, defaultOptions = BACKEND_CLASSES[name]
+    moduleName, className = classPath.rsplit(".", 1)
+    backendClass = getattr(importlib.import_module(moduleName), className)
+    return backendClass(**{**defaultOptions, **options})
+
+
+def selectBackend(size, backendBySize, defaultBackend="gurobi", **options):
+    # グリッドサイズに応じたソルバーを作る．backendBySizeにないサイズはdefaultBackend
+    return createBackend(backendBySize.get(size, defaultBackend), **options)
+
+
+# 引数でソルバーを指定しなかった場合に使うソルバー
+activeBackend = None
+
+
+def setActiveBackend(solverBackend):
+    global activeBackend
+    activeBackend = solverBackend
+
+
+def getActiveBackend():
+    # 未設定ならGurobiを使う
+    if activeBackend is None:
+        setActiveBackend(createBackend("gurobi"))
+    return activeBackend
+
+
+def iterSolutions(board, limit=None, excludedSolutions=None, solverBackend=None):
+    # 解盤面を1つずつ返すジェネレータ．必要な数だけ取り出せばよく，
+    # 途中でclose()する(またはfor文を抜けて捨てる)とソルバー側の列挙も片付けられる
+    if solverBackend is None:
+        solverBackend = getActiveBackend()
+    solutionStream = solverBackend.generateSolutions(board, limit, excludedSolutions)
+    try:
+        yield from solutionStream
+    finally:
+        solutionStream.close()
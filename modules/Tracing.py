@@ -0,0 +1,165 @@
+import json
+import os
+import time
+
+# 生成ループの各段階(モデル構築，optimize，解の取り出し，投票配列の更新，ヒントの選択，絞り込み)の
+# 所要時間などを1行1イベントのJSON(JSONL)で書き出す
+# startTraceを呼ぶまでは何も記録せず，phase()は何もしない共通のオブジェクトを返すだけなので負荷はほぼない
+#
+# イベントの例:
+#   {"phase": "optimize", "duration": 0.012, "time": 3.41, "pid": 123, "algorithm": "G1", "round": 4,
+#    "runtime": 0.011, "nodeCount": 0.0, "solutionCount": 1}
+
+tracer = None  # 記録中のTracer．記録しないときはNone
+
+
+class Tracer:
+    def __init__(self, path):
+        self.path = path
+        self.startTime = time.perf_counter()
+        self.context = {}  # 全てのイベントに付ける情報(アルゴリズム名，何回目のヒント追加か など)
+        self.file = None
+        self.filePid = None
+
+    def write(self, event):
+        # プロセスごとに追記モードで開く(複数プロセスから同じファイルに書いてよい．1行ずつ書き出す)
+        if self.file is None or self.filePid != os.getpid():
+            self.file = open(self.path, 'a', encoding="utf-8", buffering=1)
+            self.filePid = os.getpid()
+        record = {**event, "time": round(time.perf_counter() - self.startTime, 6), "pid": os.getpid(), **self.context}
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self):
+        if self.file is not None and self.filePid == os.getpid():
+            self.file.close()
+        self.file = None
+
+
+class Phase:
+    # withで囲んだ区間の所要時間を1つのイベントとして書き出す．set()で情報を追加できる
+    __slots__ = ("name", "fields", "startTime")
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.startTime = None
+
+    def __enter__(self):
+        self.startTime = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.startTime
+        if tracer is not None:
+            tracer.write({"phase": self.name, "duration": round(duration, 6), **self.fields})
+        return False
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+
+class PhaseTotals:
+    # 1つの解ごとに繰り返す短い区間は，段階ごとに合計時間と回数だけを数え，emit()でまとめて書き出す
+    def __init__(self):
+        self.durations = {}
+        self.counts = {}
+
+    def measure(self, name):
+        return TotalsSpan(self, name)
+
+    def emit(self, **fields):
+        if tracer is not None:
+            for name, duration in self.durations.items():
+                tracer.write({"phase": name, "duration": round(duration, 6), "calls": self.counts[name], **fields})
+        self.durations.clear()
+        self.counts.clear()
+
+
+class TotalsSpan:
+    __slots__ = ("totals", "name", "startTime")
+
+    def __init__(self, totals, name):
+        self.totals = totals
+        self.name = name
+
+    def __enter__(self):
+        self.startTime = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.startTime
+        self.totals.durations[self.name] = self.totals.durations.get(self.name, 0.0) + duration
+        self.totals.counts[self.name] = self.totals.counts.get(self.name, 0) + 1
+        return False
+
+
+class NullPhase:
+    # 記録しないときに使う何もしない区間(phase()，phaseTotals()の両方の代わり)
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **fields):
+        pass
+
+    def measure(self, name):
+        return self
+
+    def emit(self, **fields):
+        pass
+
+
+NULL_PHASE = NullPhase()
+
+
+def startTrace(path):
+    # pathにイベントを追記していく(既にあるファイルには追記する)
+    global tracer
+    stopTrace()
+    tracer = Tracer(path)
+
+
+def stopTrace():
+    global tracer
+    if tracer is not None:
+        tracer.close()
+    tracer = None
+
+
+def isTracing():
+    return tracer is not None
+
+
+def setTraceContext(**fields):
+    # 以降の全てのイベントに付ける情報を設定する(Noneを渡すと消す)
+    if tracer is None:
+        return
+    for key, value in fields.items():
+        if value is None:
+            tracer.context.pop(key, None)
+        else:
+            tracer.context[key] = value
+
+
+def phase(name, **fields):
+    # 使い方: with phase("selectHint") as span: ... span.set(minCount=minCount)
+    if tracer is None:
+        return NULL_PHASE
+    return Phase(name, fields)
+
+
+def phaseTotals():
+    # 使い方: totals = phaseTotals() / with totals.measure("tally"): ... / totals.emit(solutionCount=n)
+    if tracer is None:
+        return NULL_PHASE
+    return PhaseTotals()
+
+
+def traceEvent(name, **fields):
+    # 所要時間のない1回きりのイベント(生成の開始・終了など)
+    if tracer is not None:
+        tracer.write({"event": name, **fields})
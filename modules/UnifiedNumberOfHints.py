@@ -1,5 +1,5 @@
 import random
-from utility.printBoard import printBoard
+from modules.ProgressReporter import report, reportBoard
 
 
 class UnifiedNumberOfHints:
@@ -20,7 +20,7 @@ class UnifiedNumberOfHints:
         for i, board in enumerate(self.boards):
             currentHintCount = self.countHints(board)
             if currentHintCount < targetHints:
-                print(f"\n盤面 {i + 1} のヒント追加処理開始:")
+                report(f"\n盤面 {i + 1} のヒント追加処理開始:")
                 symmetry_type = ['horizontal', 'vertical', 'diagonal_up', 'diagonal_down'][i]
                 self.addHints(board, targetHints - currentHintCount, symmetry_type)
 
@@ -41,7 +41,7 @@ class UnifiedNumberOfHints:
             if isRandomAdditionOrder:
                 r, c = positions.pop()
                 board[r][c] = self.boardA[r][c]
-                print(f"ランダム追加: 位置 ({c + 1}, {r + 1}) にヒント {board[r][c]} を追加")
+                report(f"ランダム追加: 位置 ({c + 1}, {r + 1}) にヒント {board[r][c]} を追加")
                 totalNumberOfhintsAdded += 1
                 lastAddedPosition = (r, c)
                 isRandomAdditionOrder = 0
@@ -50,7 +50,7 @@ class UnifiedNumberOfHints:
                 if (symR, symC) in positions:
                     board[symR][symC] = self.boardA[symR][symC]
                     positions.remove((symR, symC))
-                    print(f"対称追加 ({symmetry_type}): 位置 ({symC + 1}, {symR + 1}) にヒント {board[symR][symC]} を追加")
+                    report(f"対称追加 ({symmetry_type}): 位置 ({symC + 1}, {symR + 1}) にヒント {board[symR][symC]} を追加")
                     totalNumberOfhintsAdded += 1
                 isRandomAdditionOrder = 1
 
@@ -67,7 +67,7 @@ class UnifiedNumberOfHints:
             return c, r
 
     def printBoardStatus(self, board):
-        print("更新後の盤面:")
-        printBoard(board)
-        print(f"現在のヒント数: {self.countHints(board)}")
-        print("--------------------")
+        # 盤面の表示はVERBOSEのときだけ
+        reportBoard(board, "更新後の盤面:")
+        report(f"現在のヒント数: {self.countHints(board)}")
+        report("--------------------")
@@ -1,11 +1,23 @@
 import time
-import gurobipy as gp
-from gurobipy import GRB
-from utility.printBoard import printBoard
+import random
+import numpy as np
+from modules.SolverBackend import getActiveBackend, iterSolutions
+from modules.OccurrenceCount import addSolutionToOccurrenceCount, findMinOccurrence
+from modules.Checkpoint import saveCheckpoint, loadCheckpoint, removeCheckpoint
+from modules.ProgressReporter import RESULT, report, reportBoard, reportCount
+from modules.Tracing import phase, phaseTotals, setTraceContext, traceEvent
 
 # 解盤面の保存なし
 
-def generateUniqueSolutionG1(board, MAX_SOLUTIONS, LIMIT_TIME, changeGenerationLimit, generationLimits):
+# changeGenerationLimit
+# 0: 毎回MAX_SOLUTIONS個生成
+# 1: generationLimitsに格納された上限数をヒント追加ごとに設定
+# 2: 出現回数最小の(マス, 数字)が直近stableWindow個の解の間変わらなければ列挙を打ち切る(上限はMAX_SOLUTIONS)
+# checkpointPathを指定すると，checkpointInterval秒ごとに途中状態を保存し，次回はその続きから再開する
+# inputBoardはランダムにヒントを追加する前の入力盤面(途中状態の照合用．省略時はboard)
+def generateUniqueSolutionG1(board, MAX_SOLUTIONS, LIMIT_TIME, changeGenerationLimit, generationLimits, solverBackend=None, stableWindow=30,
+                             checkpointPath=None, checkpointInterval=60,
+                             inputBoard=None):
     start_time = time.time()
     timePerHint = []  # ヒントごとの生成時間を記録するリスト
     numberOfHintsAdded = 0  # 追加したヒントの数をカウントする変数
@@ -13,17 +25,57 @@ def generateUniqueSolutionG1(board, MAX_SOLUTIONS, LIMIT_TIME, changeGenerationL
     currentSolution = None  # 唯一解を保存する変数
     addedHintInformation = []  # ヒントの追加情報を保存するリスト
 
-    print("唯一解生成開始")
+    if solverBackend is None:
+        solverBackend = getActiveBackend()
+
+    report("唯一解生成開始")
     size = len(board)
     max_solutions = MAX_SOLUTIONS  # 生成する解の最大数
 
+    # 保存された途中状態があれば，そこから再開する
+    # 保存した途中状態が同じ入力のものかは，ランダムなヒントを追加する前の入力盤面(inputBoard)で確かめる
+    # 再開する場合，boardは保存した盤面(ランダムに追加したヒントも含む)に置き換える
+    if inputBoard is None:
+        inputBoard = board
+    inputBoard = [row[:] for row in inputBoard]
+    checkpoint = loadCheckpoint(checkpointPath, "G1", inputBoard)
+    if checkpoint is not None:
+        for i in range(size):
+            board[i][:] = checkpoint["board"][i]
+        numberOfHintsAdded = checkpoint["numberOfHintsAdded"]
+        numberOfGeneratedBoards = checkpoint["numberOfGeneratedBoards"]
+        timePerHint = checkpoint["timePerHint"]
+        addedHintInformation = checkpoint["addedHintInformation"]
+        random.setstate(checkpoint["randomState"])
+        start_time = time.time() - checkpoint["elapsedTime"]
+        report(f"チェックポイントから再開します (追加したヒントの数: {numberOfHintsAdded})", RESULT)
+    lastCheckpointTime = time.time()
+    traceEvent("generationStart", algorithm="G1", size=size, backend=solverBackend.name)
+
     while True:  # 外部ループ: 内部ループ内で解盤面が一つしか見つからなくなったら終了
+        # 前回の保存からcheckpointInterval秒以上経っていれば途中状態を保存
+        if checkpointPath is not None and time.time() - lastCheckpointTime >= checkpointInterval:
+            saveCheckpoint(checkpointPath, {
+                "algorithm": "G1",
+                "inputBoard": inputBoard,
+                "board": board,
+                "numberOfHintsAdded": numberOfHintsAdded,
+                "numberOfGeneratedBoards": numberOfGeneratedBoards,
+                "timePerHint": timePerHint,
+                "addedHintInformation": addedHintInformation,
+                "randomState": random.getstate(),
+                "elapsedTime": time.time() - start_time,
+            })
+            lastCheckpointTime = time.time()
+
         hint_start_time = time.time()  # ヒント追加の開始時間を記録
         solution_count = 0  # 解の数をカウント
+        setTraceContext(algorithm="G1", round=numberOfHintsAdded)
+        totals = phaseTotals()  # 解ごとの段階の所要時間(トレース中のみ)
 
         # 生成する解の最大数を設定
-        if changeGenerationLimit == 0:
-            max_solutions = MAX_SOLUTIONS
+        if changeGenerationLimit in (0, 2):
+            max_solutions = MAX_SOLUTIONS  # Noneなら上限なし
         else:
             if numberOfHintsAdded < len(generationLimits):
                 max_solutions = generationLimits[numberOfHintsAdded]
@@ -31,94 +83,57 @@ def generateUniqueSolutionG1(board, MAX_SOLUTIONS, LIMIT_TIME, changeGenerationL
                 max_solutions = generationLimits[-1]  # リストの最後の要素を使用
 
         # 111~999の連続した配列 (0-indexedなので実際は[0][0][0]から[8][8][8])
-        occurrence_count = [
-            [[0 for _ in range(size)] for _ in range(size)] for _ in range(size)]
-
-        # Gurobiモデルの作成
-        model = gp.Model("Sudoku")
-        model.setParam('OutputFlag', 0)  # ソルバー出力を抑制
-
-        # 決定変数の作成
-        isValueInCell = model.addVars(
-            size, size, size, vtype=GRB.BINARY, name="IsValueInCell")
+        occurrence_count = np.zeros((size, size, size), dtype=np.int64)
+
+        lastMinChoice = None  # 直前の解までで出現回数最小の (マス, 数字)
+        stableCount = 0  # lastMinChoice が変わらなかった解の数
+        isStable = False  # 出現回数最小の (マス, 数字) が安定したので打ち切ったか
+
+        # 内部ループ: 解盤面を最大 max_solutions 個まで1つずつ取り出す
+        solutionStream = iterSolutions(board, max_solutions, solverBackend=solverBackend)
+        while time.time() - start_time <= LIMIT_TIME:
+            with totals.measure("solve"):
+                solution = next(solutionStream, None)
+            if solution is None:
+                break
 
-        # 制約条件の追加
-        # 1. 各マスには1つの数字のみが入る
-        for i in range(size):
-            for j in range(size):
-                model.addConstr(
-                    sum(isValueInCell[i, j, k] for k in range(size)) == 1)
+            solution_count += 1
+            lastSolution = solution  # 最後に見つかった解盤面
+
+            # 111~999の連続した配列に情報を格納
+            with totals.measure("tally"):
+                addSolutionToOccurrenceCount(occurrence_count, solution)
+
+            reportCount("解", solution_count)
+
+            # 解ごとの表示はreportCountが間引く(configureProgressで間隔を変えられる)
+            # printBoard(solution)
+
+            if changeGenerationLimit == 2:
+                with totals.measure("stabilityCheck"):
+                    minChoice = findMinOccurrence(occurrence_count, board)[1:]
+                if minChoice != lastMinChoice:
+                    lastMinChoice = minChoice
+                    stableCount = 0
+                else:
+                    stableCount += 1
+                    if stableCount >= stableWindow:
+                        solutionStream.close()  # 残りの列挙は不要
+                        isStable = True
+                        report(f"出現回数最小のマスが{stableWindow}解の間変わらなかったため列挙を打ち切ります。")
+                        break
+        else:  # LIMIT_TIMEを超えた場合
+            solutionStream.close()  # 列挙を打ち切ってソルバーを片付ける
+            totals.emit(solutionCount=solution_count)
+            report("制限時間を超えたため処理を終了します。", RESULT)
+            # currentSolutionもNoneで返す
+            return None, None, numberOfHintsAdded, numberOfGeneratedBoards, timePerHint, addedHintInformation
 
-        # 2. 各行には1から9の数字が1つずつ入る
-        for i in range(size):
-            for k in range(size):
-                model.addConstr(
-                    sum(isValueInCell[i, j, k] for j in range(size)) == 1)
-
-        # 3. 各列には1から9の数字が1つずつ入る
-        for j in range(size):
-            for k in range(size):
-                model.addConstr(
-                    sum(isValueInCell[i, j, k] for i in range(size)) == 1)
-
-        # 4. 各ブロックには1から9の数字が1つずつ入る
-        block_size = int(size ** 0.5)
-        for bi in range(block_size):
-            for bj in range(block_size):
-                for k in range(size):
-                    model.addConstr(sum(isValueInCell[i, j, k]
-                                        for i in range(bi * block_size, (bi + 1) * block_size)
-                                        for j in range(bj * block_size, (bj + 1) * block_size)) == 1)
-
-        # 5. 初期値（ヒント）の設定
-        for i in range(size):
-            for j in range(size):
-                if board[i][j] != 0:
-                    model.addConstr(isValueInCell[i, j, board[i][j] - 1] == 1)
-
-        # 内部ループ
-        while solution_count < max_solutions:
-            current_time = time.time()
-            if current_time - start_time > LIMIT_TIME:  # LIMIT_TIMEを超えた場合
-                print("制限時間を超えたため処理を終了します。")
-                # currentSolutionもNoneで返す
-                return None, None, numberOfHintsAdded, numberOfGeneratedBoards, timePerHint, addedHintInformation
-
-            # モデルの解決
-            model.optimize()
-
-            if model.status == GRB.OPTIMAL:
-                solution_count += 1
-                solution = [[0 for _ in range(size)] for _ in range(size)]
-                for i in range(size):
-                    for j in range(size):
-                        for k in range(size):
-                            if isValueInCell[i, j, k].x > 0.5:
-                                solution[i][j] = k + 1
-
-                # 111~999の連続した配列に情報を格納
-                for i in range(size):
-                    for j in range(size):
-                        value = solution[i][j]
-                        occurrence_count[i][j][value - 1] += 1
-
-                # 新しい解を除外する制約を作成
-                new_constraint = sum(
-                    isValueInCell[i, j, solution[i][j] - 1] for i in range(size) for j in range(size))
-                max_matching_cells = size * size - 1  # 全マス数から1を引いた値
-                model.addConstr(new_constraint <= max_matching_cells)
-
-                print(f"解 {solution_count}")
-
-                #↓解が見つかった報告を少なくしたいとき
-                #if(solution_count % 100 ==0):
-                #    print(f"解 {solution_count}")
-                # printBoard(solution)
-            else:
-                print("全ての解盤面を生成しました。")
-                break
+        if not isStable and (max_solutions is None or solution_count < max_solutions):
+            report("全ての解盤面を生成しました。")
 
-        print(f"生成された解の数: {solution_count}")
+        report(f"生成された解の数: {solution_count}")
+        totals.emit(solutionCount=solution_count, isStable=isStable)
 
         numberOfGeneratedBoards.append(solution_count)
 
@@ -126,29 +141,22 @@ def generateUniqueSolutionG1(board, MAX_SOLUTIONS, LIMIT_TIME, changeGenerationL
             hint_end_time = time.time()  # ヒント追加の終了時間を記録
             hint_elapsed_time = hint_end_time - hint_start_time
             timePerHint.append(hint_elapsed_time)
-            print("唯一解が見つかりました。")
-            print(f"追加したヒントの数: {numberOfHintsAdded}")
-            currentSolution = solution  # 唯一解を保存
+            report("唯一解が見つかりました。", RESULT)
+            report(f"追加したヒントの数: {numberOfHintsAdded}", RESULT)
+            currentSolution = lastSolution  # 唯一解を保存
+            removeCheckpoint(checkpointPath)  # 完了したので途中状態は不要
             return board, currentSolution, numberOfHintsAdded, numberOfGeneratedBoards, timePerHint, addedHintInformation
 
-        # 最小出現回数のマスを見つける
-        min_count = float('inf')
-        min_pos = None
-        min_value = None
-        for i in range(size):
-            for j in range(size):
-                if board[i][j] == 0:  # 空のマスのみを対象とする
-                    for k in range(size):
-                        if 0 < occurrence_count[i][j][k] < min_count:
-                            min_count = occurrence_count[i][j][k]
-                            min_pos = (i, j)
-                            min_value = k + 1
+        # 最小出現回数のマスを見つける(空のマスのみを対象とする)
+        with phase("selectHint") as span:
+            min_count, min_pos, min_value = findMinOccurrence(occurrence_count, board)
+            span.set(minCount=min_count)
 
         if min_pos is None:
             hint_end_time = time.time()  # ヒント追加の終了時間を記録
             hint_elapsed_time = hint_end_time - hint_start_time
             timePerHint.append(hint_elapsed_time)
-            print("エラー: 最小出現回数のマスが見つかりませんでした。")
+            report("エラー: 最小出現回数のマスが見つかりませんでした。", RESULT)
             return None, None, numberOfHintsAdded, numberOfGeneratedBoards, timePerHint, addedHintInformation
 
         # 最小出現回数のマスを盤面に追加
@@ -156,12 +164,11 @@ def generateUniqueSolutionG1(board, MAX_SOLUTIONS, LIMIT_TIME, changeGenerationL
         board[i][j] = min_value
         numberOfHintsAdded += 1  # ヒントを追加したのでカウントを増やす
         addedHintInformation.append((i+1, j+1, min_value))  # 追加したヒントの位置と値を記録
-        print(f"マス ({i + 1}, {j + 1}) に {min_value} を追加しました。")
-        print(f"現在追加したヒントの数: {numberOfHintsAdded}")
+        report(f"マス ({i + 1}, {j + 1}) に {min_value} を追加しました。")
+        report(f"現在追加したヒントの数: {numberOfHintsAdded}")
 
         # 盤面の表示
-        print("現在の盤面:")
-        printBoard(board)
+        reportBoard(board, "現在の盤面:")
 
         # ヒント追加の終了時間を記録
         hint_end_time = time.time()
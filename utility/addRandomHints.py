@@ -0,0 +1,30 @@
+import random
+
+
+def addRandomHints(inputBoard, solutionBoard, targetHintCount):
+    # 入力盤面のヒントに，解盤面からランダムに選んだマスをヒント数がtargetHintCountになるまで追加した盤面を返す
+    size = len(inputBoard)
+    selectedBoard = [[0 for _ in range(size)]
+                     for _ in range(size)]  # 空の盤面を作成
+    positions = [(i, j) for i in range(size)
+                 for j in range(size)]
+    random.shuffle(positions)
+
+    # 入力盤面のヒントを追加
+    hints_added = 0
+    for i in range(size):
+        for j in range(size):
+            if inputBoard[i][j] != 0:
+                selectedBoard[i][j] = inputBoard[i][j]
+                hints_added += 1
+
+    # 残りのヒントをランダムに追加
+    for pos in positions:
+        if hints_added >= targetHintCount:
+            break
+        i, j = pos
+        if selectedBoard[i][j] == 0:
+            selectedBoard[i][j] = solutionBoard[i][j]
+            hints_added += 1
+
+    return selectedBoard
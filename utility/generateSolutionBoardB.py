@@ -0,0 +1,15 @@
+from modules.BitmaskSolver import BitmaskSolver
+
+
+def generateSolutionBoardB(board):
+    # ビット集合の制約伝播ソルバーで盤面を埋める(Gurobi不要)
+    solution = BitmaskSolver(board).solve(randomize=True)
+
+    # 解が見つかった場合、盤面を更新
+    if solution is not None:
+        for r in range(len(board)):
+            for c in range(len(board)):
+                board[r][c] = solution[r][c]
+        return True
+    else:
+        return False